@@ -0,0 +1,114 @@
+# arrow_fetch.py
+"""
+Optional Apache Arrow fetch path (needs pyarrow).
+Result sets arrive as Arrow record batches instead of per-row Python
+tuples, and ResultStore copies their numeric / date columns in bulk from
+the Arrow buffers. Sources:
+  DuckDB       cursor.fetch_record_batch() (see backends.StatementCursor)
+  SQL Server   arrow-odbc, which fetches over ODBC straight into Arrow
+               buffers (pip install arrow-odbc)
+"""
+
+from array import array
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+try:
+    import arrow_odbc  # Optional bulk ODBC -> Arrow reader
+except ImportError:
+    arrow_odbc = None
+
+ARROW_BATCH_SIZE = 50_000  # Rows per record batch
+DATE_OFFSET = 719163  # date(1970, 1, 1).toordinal(): Arrow date32 counts days from 1970
+
+
+def available():
+    return pa is not None
+
+
+def odbc_available():
+    return pa is not None and arrow_odbc is not None
+
+
+def type_code(arrow_type):
+    """Python type matching an Arrow type, like pyodbc's type_code (None = store as objects)."""
+    if pa.types.is_boolean(arrow_type):
+        return bool
+    if pa.types.is_integer(arrow_type):
+        return int
+    if pa.types.is_floating(arrow_type):
+        return float
+    if pa.types.is_timestamp(arrow_type) and arrow_type.tz is None:
+        return datetime
+    if pa.types.is_date32(arrow_type):
+        return date
+    return None
+
+
+def columns(schema):
+    """[(name, type_code)] for an Arrow schema, in the shape of the engine's "columns" event."""
+    return [(field.name, type_code(field.type)) for field in schema]
+
+
+def batch_rows(batch):
+    """Rows of a record batch as tuples (for consumers that need rows, e.g. CSV output)."""
+    return list(zip(*[column.to_pylist() for column in batch.columns]))
+
+
+def _int_type(itemsize):
+    return {1: pa.int8(), 2: pa.int16(), 4: pa.int32(), 8: pa.int64()}[itemsize]
+
+
+def _raw_bytes(arr, itemsize):
+    """The value buffer of a fixed-width Arrow array, as bytes."""
+    buffer = memoryview(arr.buffers()[1])
+    return buffer[arr.offset * itemsize:(arr.offset + len(arr)) * itemsize]
+
+
+def column_bytes(column, kind, typecode):
+    """
+    (values, nulls) of an Arrow column encoded the way ResultStore keeps
+    `kind` in an array of `typecode`, or None if it can't be done in bulk
+    (the caller then falls back to Python values).
+    """
+    t = column.type
+    itemsize = array(typecode).itemsize
+    try:
+        if kind == "int" and (pa.types.is_integer(t) or pa.types.is_boolean(t)):
+            encoded = pc.cast(column, _int_type(itemsize))
+        elif kind == "bool" and pa.types.is_boolean(t):
+            encoded = pc.cast(column, _int_type(itemsize))
+        elif kind == "float" and (pa.types.is_floating(t) or pa.types.is_integer(t)):
+            encoded = pc.cast(column, pa.float64())
+        elif kind == "datetime" and pa.types.is_timestamp(t) and t.tz is None:
+            # ResultStore keeps datetimes as microseconds since 1970, the same as timestamp[us]
+            encoded = pc.cast(pc.cast(column, pa.timestamp("us"), safe=False), pa.int64())
+        elif kind == "date" and pa.types.is_date32(t):
+            encoded = pc.cast(pc.add(pc.cast(pc.cast(column, pa.int32()), pa.int64()), DATE_OFFSET), _int_type(itemsize))
+        else:
+            return None
+    except pa.ArrowException:
+        return None  # Out of range for the typed array
+
+    if column.null_count:
+        nulls = _raw_bytes(pc.cast(column.is_null(), pa.int8()), 1)
+    else:
+        nulls = bytes(len(column))
+    return _raw_bytes(encoded, itemsize), nulls
+
+
+def odbc_reader(conn_str, sql, batch_size=ARROW_BATCH_SIZE):
+    """arrow-odbc batch reader for `sql` (opens its own connection; None if no result set)."""
+    return arrow_odbc.read_arrow_batches_from_odbc(query=sql, connection_string=conn_str,
+                                                   batch_size=batch_size)
+
+
+def more_results(reader):
+    """Move an arrow-odbc reader to its next result set; False when there is none."""
+    more = getattr(reader, "more_results", None)
+    return bool(more and more())
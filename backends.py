@@ -0,0 +1,301 @@
+# backends.py
+"""
+Database backends behind the connection pool and the engine.
+A connection string picks its backend:
+  "sqlite:<path>"   local SQLite file (":memory:" works too)
+  "duckdb:<path>"   local DuckDB file (needs the duckdb package)
+  anything else     SQL Server through pyodbc (the ODBC string from get_conn_str)
+Every backend hands out pyodbc-shaped connections and cursors (execute,
+description, fetchmany, nextset, rowcount, cancel, messages), so the engine,
+paging and result grid code doesn't care which one it talks to.
+"""
+
+import re
+import sqlite3
+from decimal import Decimal
+
+import arrow_fetch
+from sql_text import is_code, split_statements, tokenize
+
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+try:
+    import duckdb  # Optional: columnar engine for local analytical work
+except ImportError:
+    duckdb = None
+
+# sqlite3 can't bind Decimal (the parameter panel's type for 1.5); REAL is the nearest it has
+sqlite3.register_adapter(Decimal, float)
+
+# File extensions that make a "database name" a local file
+LOCAL_EXTENSIONS = {
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".duckdb": "duckdb",
+}
+
+
+class StatementCursor:
+    """
+    pyodbc-shaped cursor over a DB-API driver that runs one statement per
+    execute() (sqlite3, duckdb): a script is split into statements and
+    nextset() runs the next one, like a multi-statement SQL Server batch.
+    Column type codes come from the first row, since these drivers don't
+    report Python types in `description` (or from the Arrow schema after
+    use_arrow()).
+    """
+
+    def __init__(self, cursor, interrupt, is_complete=None):
+        self._cursor = cursor
+        self._interrupt = interrupt
+        self._is_complete = is_complete
+        self._pending = []
+        self._peeked = []
+        self._reader = None
+        self.arrow_size = None  # Set by use_arrow()
+        self.description = None
+        self.rowcount = -1
+        self.messages = []
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self._pending = []
+        for statement in split_statements(sql, self._is_complete):
+            # Each statement takes the parameters for its own `?` markers
+            markers = sum(token.count("?") for token in tokenize(statement) if is_code(token))
+            self._pending.append((statement, params[:markers]))
+            params = params[markers:]
+        self.description = None
+        self.rowcount = -1
+        if self._pending:
+            self._run(*self._pending.pop(0))
+        return self
+
+    def _run(self, statement, params=()):
+        self._cursor.execute(statement, tuple(params))
+        self._peeked = []
+        self._reader = None
+        self.rowcount = getattr(self._cursor, "rowcount", -1)
+        description = self._cursor.description
+        if not description:
+            self.description = None
+            return
+        if self.arrow_size:
+            # Reading ahead a row would cost a whole DuckDB chunk, so take the types from Arrow
+            open_reader = getattr(self._cursor, "to_arrow_reader", None) or self._cursor.fetch_record_batch
+            self._reader = open_reader(self.arrow_size)
+            self.description = [(field.name, arrow_fetch.type_code(field.type)) + tuple(d[2:])
+                                for field, d in zip(self._reader.schema, description)]
+            return
+        self._peeked = self._cursor.fetchmany(1)
+        first = self._peeked[0] if self._peeked else None
+        self.description = [
+            (d[0], type(first[i]) if first is not None and first[i] is not None else d[1]) + tuple(d[2:])
+            for i, d in enumerate(description)
+        ]
+
+    @property
+    def supports_arrow(self):
+        """True if the driver can hand out Arrow record batches (DuckDB with pyarrow)."""
+        return arrow_fetch.available() and hasattr(self._cursor, "fetch_record_batch")
+
+    def use_arrow(self, size):
+        """Deliver the results of later execute() calls through arrow_batches()."""
+        self.arrow_size = size
+
+    def arrow_batches(self):
+        """Rows of the current result as pyarrow RecordBatches (after use_arrow())."""
+        return iter(self._reader)
+
+    def nextset(self):
+        if not self._pending:
+            return False
+        self._run(*self._pending.pop(0))
+        return True
+
+    def fetchmany(self, size=1):
+        rows, self._peeked = self._peeked[:size], self._peeked[size:]
+        if len(rows) < size:
+            rows = list(rows) + list(self._cursor.fetchmany(size - len(rows)))
+        return rows
+
+    def fetchall(self):
+        rows, self._peeked = list(self._peeked), []
+        return rows + list(self._cursor.fetchall())
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def cancel(self):
+        """Interrupt the running statement (safe to call from another thread)."""
+        self._interrupt()
+
+    def close(self):
+        self._cursor.close()
+
+
+class LocalConnection:
+    """Wraps a sqlite3 / duckdb connection so cursor() returns StatementCursors."""
+
+    def __init__(self, conn, make_cursor):
+        self._conn = conn
+        self._make_cursor = make_cursor
+
+    def cursor(self):
+        return self._make_cursor(self._conn)
+
+    def close(self):
+        self._conn.close()
+
+
+# ---------------- Backends ----------------
+
+class MSSQLBackend:
+    """SQL Server through pyodbc (the original and default backend)."""
+    name = "mssql"
+    stats = True  # SET STATISTICS IO / TIME / XML
+    paging = True  # TOP and OFFSET ... FETCH
+    tables_sql = ("SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE FROM INFORMATION_SCHEMA.TABLES "
+                  "ORDER BY TABLE_SCHEMA, TABLE_NAME")
+    columns_sql = ("SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS "
+                   "WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ? ORDER BY ORDINAL_POSITION")
+    databases_sql = ("SELECT name FROM sys.databases "
+                     "WHERE state_desc = 'ONLINE' AND HAS_DBACCESS(name) = 1 ORDER BY name")
+    session_sql = "SELECT @@TRANCOUNT, DB_NAME()"
+
+    def connect(self, conn_str):
+        if pyodbc is None:
+            raise ImportError("SQL Server connections need pyodbc (pip install pyodbc)")
+        return pyodbc.connect(conn_str, autocommit=True)
+
+    def session_clean(self, conn, conn_str):
+        """
+        True if `conn` is as a fresh connection would be: no open transaction
+        and still in the connection string's database (a script's USE or
+        BEGIN TRAN would otherwise leak into the next run on it).
+        """
+        (trancount, db_name), = self._query(conn, self.session_sql)
+        match = re.search(r"(?:^|;)\s*DATABASE\s*=\s*([^;]*)", conn_str, re.I)
+        expected = match.group(1).strip().strip("{}") if match else None
+        return trancount == 0 and (not expected or (db_name or "").lower() == expected.lower())
+
+    def tables(self, conn):
+        """[(schema, name, type)] of the tables and views in the database."""
+        return self._query(conn, self.tables_sql)
+
+    def columns(self, conn, schema, table):
+        """[(column, data type)] of one table, in column order."""
+        return self._query(conn, self.columns_sql, [schema, table])
+
+    def databases(self, conn):
+        """Names of the databases on the server this login can open."""
+        return [row[0] for row in self._query(conn, self.databases_sql)]
+
+    def _query(self, conn, sql, params=None):
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            return [tuple(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+class SQLiteBackend(MSSQLBackend):
+    """Local SQLite file through the standard library."""
+    name = "sqlite"
+    stats = False
+    paging = False
+    tables_sql = ("SELECT 'main', name, upper(type) FROM sqlite_master "
+                  "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    columns_sql = "SELECT name, type FROM pragma_table_info(?) ORDER BY cid"
+
+    def connect(self, conn_str):
+        path = conn_str.split(":", 1)[1] or ":memory:"
+        # Pooled connections move between worker threads; isolation_level=None = autocommit
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        return LocalConnection(conn, lambda c: StatementCursor(c.cursor(), c.interrupt, sqlite3.complete_statement))
+
+    def columns(self, conn, schema, table):
+        return self._query(conn, self.columns_sql, [table])
+
+    def databases(self, conn):
+        return []  # One file is one database; see database.local_database_files()
+
+    def session_clean(self, conn, conn_str):
+        return not conn._conn.in_transaction
+
+
+class DuckDBBackend(MSSQLBackend):
+    """Local DuckDB file: a columnar engine for heavy analytical queries."""
+    name = "duckdb"
+    stats = False
+    paging = False
+
+    def connect(self, conn_str):
+        if duckdb is None:
+            raise ImportError("DuckDB databases need the duckdb package (pip install duckdb)")
+        path = conn_str.split(":", 1)[1] or ":memory:"
+
+        def make_cursor(conn):
+            cursor = conn.cursor()  # Its own handle, so interrupt() only stops this cursor
+            return StatementCursor(cursor, cursor.interrupt)
+        return LocalConnection(duckdb.connect(path), make_cursor)
+
+    def databases(self, conn):
+        return []
+
+    def session_clean(self, conn, conn_str):
+        return False  # DuckDB can't report an open transaction or a USE; reopening a local file is cheap
+
+
+BACKENDS = {backend.name: backend for backend in (MSSQLBackend(), SQLiteBackend(), DuckDBBackend())}
+
+
+def backend_for(conn_str):
+    """The backend a connection string belongs to."""
+    prefix = conn_str.split(":", 1)[0].lower()
+    return BACKENDS[prefix] if prefix in ("sqlite", "duckdb") else BACKENDS["mssql"]
+
+
+def connect(conn_str):
+    """Open a new (autocommit) connection for `conn_str`."""
+    return backend_for(conn_str).connect(conn_str)
+
+
+def local_conn_str(db_name):
+    """'sqlite:...' / 'duckdb:...' if `db_name` names a local database file, else None."""
+    prefix = db_name.split(":", 1)[0].lower()
+    if prefix in ("sqlite", "duckdb"):
+        return db_name
+    for ext, backend in LOCAL_EXTENSIONS.items():
+        if db_name.lower().endswith(ext):
+            return f"{backend}:{db_name}"
+    return None
+
+
+def get_conn_str(db_name):
+    """
+    Connection string for `db_name` (also the key of its connection pool).
+    A local file name (x.sqlite / x.db / x.duckdb, or a sqlite: / duckdb:
+    prefix) selects that engine instead of SQL Server.
+    """
+    local = local_conn_str(db_name)
+    if local:
+        return local
+    return (
+        "DRIVER={ODBC Driver 18 for SQL Server};"
+        "SERVER=localhost\\SQLEXPRESS;"
+        f"DATABASE={db_name};"
+        "Trusted_Connection=yes;"
+        "Encrypt=yes;"
+        "TrustServerCertificate=yes;"
+    )
@@ -0,0 +1,177 @@
+# benchmarks/fake_pyodbc.py
+"""
+In-memory stand-in for the parts of pyodbc the app uses (connect, cursor,
+execute, description, fetchmany, nextset, cancel, messages), so the engine
+can be benchmarked without a SQL Server.
+
+A query's result is whatever shape was registered for its exact text:
+
+    register_shape("SELECT wide", rows=50_000, cols=12, string_width=200)
+
+Rows are generated when the shape is registered, so the benchmarks time
+the app's code and not the data generator. Unregistered statements behave
+like a non-SELECT that affected one row.
+"""
+
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+# Column types cycle through what pyodbc reports for common SQL Server types
+COLUMN_TYPES = (int, str, float, datetime, bool)
+
+SESSION_SQL = "SELECT @@TRANCOUNT, DB_NAME()"  # backends.MSSQLBackend.session_sql
+
+SHAPES = {}  # sql text -> {"result_sets": [(description, rows)], "latency", "fetch_latency"}
+connects = 0  # Connections opened (shows whether the pool is reused)
+
+
+class Error(Exception):
+    pass
+
+
+class OperationalError(Error):
+    pass
+
+
+def _value(kind, rng, string_width, n):
+    if kind is int:
+        return n
+    if kind is str:
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(rng.randint(1, string_width)))
+    if kind is float:
+        return round(rng.uniform(-1e6, 1e6), 4)
+    if kind is datetime:
+        return datetime(2020, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 8))
+    return rng.random() < 0.5
+
+
+def make_rows(rows, cols, string_width=20, null_density=0.0, seed=0):
+    """(description, rows) of one generated result set."""
+    rng = random.Random(seed)
+    kinds = [COLUMN_TYPES[c % len(COLUMN_TYPES)] for c in range(cols)]
+    description = [(f"col{c}_{kind.__name__}", kind, None, None, None, None, True)
+                   for c, kind in enumerate(kinds)]
+    # Wide strings are slow to generate; reuse a pool of them
+    strings = [_value(str, rng, string_width, 0) for _ in range(min(rows, 1000) or 1)]
+    data = []
+    for n in range(rows):
+        row = []
+        for kind in kinds:
+            if null_density and rng.random() < null_density:
+                row.append(None)
+            elif kind is str:
+                row.append(strings[n % len(strings)])
+            else:
+                row.append(_value(kind, rng, string_width, n))
+        data.append(tuple(row))
+    return description, data
+
+
+def register_shape(sql, rows=1000, cols=8, string_width=20, null_density=0.0,
+                   result_sets=1, latency=0.0, fetch_latency=0.0, seed=0):
+    """
+    Make `sql` return `result_sets` generated result sets.
+    `latency` is slept once per execute (server time to first row),
+    `fetch_latency` once per fetchmany() call (network round trip).
+    """
+    SHAPES[sql] = {
+        "result_sets": [make_rows(rows, cols, string_width, null_density, seed + i)
+                        for i in range(result_sets)],
+        "latency": latency,
+        "fetch_latency": fetch_latency,
+    }
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.messages = []
+        self.result_sets = []
+        self.position = 0
+        self.row_position = 0
+        self.fetch_latency = 0.0
+        self.rowcount = -1
+        self.cancelled = False
+
+    def execute(self, sql, *params):
+        self.cancelled = False
+        self.messages = []
+        shape = SHAPES.get(sql.strip())
+        if sql.strip() == "SELECT 1":  # pool health check
+            self.result_sets = [([("", int, None, None, None, None, False)], [(1,)])]
+            self.fetch_latency = 0.0
+        elif sql.strip() == SESSION_SQL:  # pool check-in: no open transaction, still in the connect database
+            self.result_sets = [([("", int, None, None, None, None, False), ("", str, None, None, None, None, True)],
+                                 [(0, self.connection.database)])]
+            self.fetch_latency = 0.0
+        elif shape is None:
+            self.result_sets = [None]
+            self.fetch_latency = 0.0
+        else:
+            self.result_sets = shape["result_sets"]
+            self.fetch_latency = shape["fetch_latency"]
+            self._sleep(shape["latency"])
+        self.position = 0
+        self.row_position = 0
+        self.rowcount = -1 if self.result_sets[0] else 1
+        return self
+
+    def _sleep(self, seconds):
+        if seconds:
+            time.sleep(seconds)
+        if self.cancelled:
+            raise OperationalError("Operation canceled")
+
+    @property
+    def description(self):
+        current = self.result_sets[self.position]
+        return current[0] if current else None
+
+    def fetchmany(self, size=1):
+        self._sleep(self.fetch_latency)
+        rows = self.result_sets[self.position][1]
+        batch = rows[self.row_position:self.row_position + size]
+        self.row_position += len(batch)
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(len(self.result_sets[self.position][1]))
+
+    def fetchone(self):
+        batch = self.fetchmany(1)
+        return batch[0] if batch else None
+
+    def nextset(self):
+        self.position += 1
+        self.row_position = 0
+        return self.position < len(self.result_sets)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self, conn_str):
+        self.conn_str = conn_str
+        self.closed = False
+        match = re.search(r"(?:^|;)\s*DATABASE\s*=\s*([^;]*)", conn_str, re.I)
+        self.database = match.group(1).strip() if match else "master"
+
+    def cursor(self):
+        if self.closed:
+            raise OperationalError("Connection closed")
+        return Cursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def connect(conn_str, **kwargs):
+    global connects
+    connects += 1
+    return Connection(conn_str)
@@ -0,0 +1,279 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmarks for the result pipeline, run against fake_pyodbc so no
+SQL Server is needed:
+
+  python benchmarks/run_benchmarks.py --out results.json
+  python benchmarks/run_benchmarks.py --quick --compare results.json
+
+Every result shape in CASES goes through:
+  engine     iter_query_events into ResultStores (connect / fetch / convert)
+  worker     the same through QueryWorker's thread and event queue
+  grid       the GUI path of run_current_query: VirtualGrid + autosize (needs Tk)
+  autosize   autosize_treeview_columns on a filled grid (needs Tk)
+  clipboard  building and setting the clipboard text (needs Tk)
+  export     DataFrame + CSV through export.py (needs pandas)
+
+Tk benchmarks are skipped without a display; on a headless Linux box run
+the script under xvfb-run. --compare exits with status 1 when a median got
+slower than the baseline by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # The app's modules live in the repo root
+
+import fake_pyodbc
+
+sys.modules["pyodbc"] = fake_pyodbc  # Must happen before pool / engine import pyodbc
+
+import database
+import pool
+from engine import QueryWorker, iter_query_events
+from result_store import ResultStore
+from timing import PhaseTimer
+
+CONN_STR = "DRIVER={fake};DATABASE=bench;"
+REPEAT = 3  # Runs per benchmark; the median is reported
+
+# Result shapes: name -> register_shape() arguments
+CASES = {
+    "narrow_100k": {"rows": 100_000, "cols": 4},
+    "wide_strings": {"rows": 20_000, "cols": 12, "string_width": 400},
+    "sparse_nulls": {"rows": 50_000, "cols": 8, "null_density": 0.6},
+    "many_sets": {"rows": 2_000, "cols": 6, "result_sets": 20},
+    "slow_server": {"rows": 20_000, "cols": 6, "latency": 0.05, "fetch_latency": 0.002},
+}
+
+
+# ---------------- Pipelines ----------------
+
+def run_engine(sql):
+    """Consume the engine's events straight into ResultStores; returns the stores."""
+    timer = PhaseTimer()
+    stores = []
+    for kind, payload in iter_query_events(CONN_STR, sql):
+        if kind == "columns":
+            stores.append(ResultStore([name for name, _ in payload], [t for _, t in payload]))
+        elif kind == "rows":
+            with timer.measure("convert"):
+                stores[-1].append_rows(payload)
+        elif kind == "timings":
+            timer.merge(payload)
+    return stores, timer
+
+
+def run_worker(sql):
+    """Same as run_engine, but through the worker thread and its queue like the GUI."""
+    timer = PhaseTimer()
+    stores = []
+    worker = QueryWorker(CONN_STR, sql).start()
+    while True:
+        kind, payload = worker.get()
+        if kind == "columns":
+            stores.append(ResultStore([name for name, _ in payload], [t for _, t in payload]))
+        elif kind == "rows":
+            with timer.measure("convert"):
+                stores[-1].append_rows(payload)
+        elif kind == "timings":
+            timer.merge(payload)
+        elif kind == "done":
+            return stores, timer
+        elif kind in ("error", "cancelled"):
+            raise RuntimeError(f"worker ended with {kind}: {payload}")
+
+
+def run_grid(root, sql):
+    """The GUI's rendering path: one VirtualGrid per result set, rows appended per batch, autosize."""
+    timer = PhaseTimer()
+    frames = []
+    tree = None
+    for kind, payload in iter_query_events(CONN_STR, sql):
+        if kind == "columns":
+            with timer.measure("render"):
+                frame = database.ttk.Frame(root)
+                frame.pack(fill="both", expand=True)
+                frames.append(frame)
+                tree = database.create_virtual_grid(frame, [n for n, _ in payload], [t for _, t in payload])
+        elif kind == "rows":
+            first_new = tree.row_count()
+            with timer.measure("convert"):
+                tree.store.append_rows(payload)
+            with timer.measure("render"):
+                tree.show_appended(first_new)
+        elif kind == "end_result":
+            with timer.measure("autosize"):
+                database.autosize_treeview_columns(tree)
+        elif kind == "timings":
+            timer.merge(payload)
+    with timer.measure("render"):
+        root.update_idletasks()
+    for frame in frames:
+        frame.destroy()
+    return timer
+
+
+# ---------------- Measuring ----------------
+
+def measure(fn, repeat):
+    """Run `fn` `repeat` times; returns {"median", "min", "runs"[, "phases"]} in seconds."""
+    runs = []
+    phases = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - started)
+        if isinstance(result, PhaseTimer):
+            phases = result.as_dict()
+        elif isinstance(result, tuple) and isinstance(result[-1], PhaseTimer):
+            phases = result[-1].as_dict()
+    entry = {"median": round(statistics.median(runs), 5), "min": round(min(runs), 5),
+             "runs": [round(r, 5) for r in runs]}
+    if phases:
+        entry["phases"] = phases  # Breakdown of the last run
+    return entry
+
+
+def open_tk():
+    """A hidden Tk root, or None when there is no display."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    return root
+
+
+def have_pandas():
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_case(name, shape, root, repeat, quick):
+    if quick:
+        shape = dict(shape, rows=max(1, shape["rows"] // 10))
+    sql = f"SELECT /* bench */ {name}"
+    fake_pyodbc.register_shape(sql, **shape)
+    results = {}
+
+    results["engine"] = measure(lambda: run_engine(sql), repeat)
+    results["worker"] = measure(lambda: run_worker(sql), repeat)
+    stores, _ = run_engine(sql)
+
+    if have_pandas():
+        from export import save_dataframe, store_dataframe
+        path = os.path.join(tempfile.gettempdir(), "sql_playground_bench.csv")
+
+        def export():
+            for store in stores:
+                save_dataframe(store_dataframe(store), path, "csv")
+        results["export"] = measure(export, repeat)
+        os.remove(path)
+
+    if root is not None:
+        results["grid"] = measure(lambda: run_grid(root, sql), repeat)
+
+        frame = database.ttk.Frame(root)
+        frame.pack(fill="both", expand=True)
+        tree = database.create_virtual_grid(frame, stores[0].columns, store=stores[0])
+        tree.refresh()
+
+        def autosize():
+            database._width_cache.clear()  # Time a cold first autosize
+            database.autosize_treeview_columns(tree)
+        results["autosize"] = measure(autosize, repeat)
+
+        def clipboard():
+            root.clipboard_clear()
+            root.clipboard_append(database.tree_clipboard_text(tree))
+        results["clipboard"] = measure(clipboard, repeat)
+        frame.destroy()
+
+    return results
+
+
+# ---------------- Reporting ----------------
+
+def compare(report, baseline, tolerance):
+    """Print changes against `baseline`; returns the names that regressed."""
+    regressions = []
+    for case, benches in report["results"].items():
+        for bench, entry in benches.items():
+            old = baseline.get("results", {}).get(case, {}).get(bench)
+            if not old:
+                continue
+            change = entry["median"] / old["median"] - 1 if old["median"] else 0.0
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{case}/{bench}")
+            print(f"{case + '/' + bench:<28}{old['median']:>10.4f}s ->{entry['median']:>10.4f}s  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a fake pyodbc driver.")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --out")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (default 0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--quick", action="store_true", help="a tenth of the rows, for a fast check")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="only run this shape (repeatable)")
+    args = parser.parse_args(argv)
+
+    root = open_tk()
+    if root is None:
+        print("No display: skipping grid / autosize / clipboard (use xvfb-run)", file=sys.stderr)
+    if not have_pandas():
+        print("pandas not installed: skipping export", file=sys.stderr)
+
+    report = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for name in args.case or CASES:
+        results = run_case(name, CASES[name], root, args.repeat, args.quick)
+        report["results"][name] = results
+        for bench, entry in results.items():
+            print(f"{name + '/' + bench:<28}{entry['median']:>10.4f}s  (min {entry['min']:.4f}s)")
+
+    pool.reset_pool()
+    if root is not None:
+        root.destroy()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
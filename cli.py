@@ -0,0 +1,218 @@
+# cli.py
+"""
+Headless runner: executes a query or script with the same engine as the GUI,
+without creating a Tk window.
+
+  python cli.py run --db test --file q.sql --out result.csv
+  python cli.py run --db test --query "SELECT * FROM sys.tables"
+
+Results stream to stdout as CSV unless --out is given (.csv streams to the
+file, .xlsx is written through export.py). A script with several result
+sets writes result.csv, result_2.csv, ...  Progress, server messages and
+the timing breakdown go to stderr, so stdout stays pipeable.
+"""
+
+import argparse
+import csv
+import os
+import queue
+import sys
+import time
+
+import arrow_fetch
+from backends import get_conn_str
+from engine import QueryWorker, dispatch
+import pool
+from result_store import ResultStore, display_value, save_dataframe, set_memory_budget, store_dataframe
+from timing import PhaseTimer, format_timings
+
+WAIT_INTERVAL_S = 0.2  # How long to block on the worker queue (keeps Ctrl+C responsive)
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _output_path(out, index):
+    """result.csv, result_2.csv, ... for the index-th result set."""
+    if index == 1:
+        return out
+    base, ext = os.path.splitext(out)
+    return f"{base}_{index}{ext}"
+
+
+class ResultWriter:
+    """Writes result sets as the engine's events arrive; use it in a `with` so an open file is always closed."""
+
+    def __init__(self, out, timer):
+        self.out = out
+        self.excel = bool(out) and out.lower().endswith(".xlsx")
+        self.timer = timer
+        self.index = 0
+        self.file = None
+        self.writer = None
+        self.store = None
+
+    def start(self, columns):
+        self.index += 1
+        names = [name for name, _ in columns]
+        if self.excel:
+            # Excel needs the whole set; keep it in the same typed store as the grid
+            self.store = ResultStore(names, [type_code for _, type_code in columns])
+            return
+        if self.out:
+            self.file = open(_output_path(self.out, self.index), "w", newline="", encoding="utf-8")
+        else:
+            self.file = sys.stdout
+            if self.index > 1:
+                self.file.write("\n")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(names)
+
+    def rows(self, rows, arrow=False):
+        with self.timer.measure("write"):
+            if self.excel and arrow:
+                self.store.append_arrow(rows)
+            elif self.excel:
+                self.store.append_rows(rows)
+            else:
+                if arrow:
+                    rows = arrow_fetch.batch_rows(rows)
+                self.writer.writerows([display_value(v) for v in row] for row in rows)
+
+    def end(self):
+        with self.timer.measure("write"):
+            if self.excel:
+                save_dataframe(store_dataframe(self.store), _output_path(self.out, self.index), "excel")
+                self.store = None
+            elif self.file is sys.stdout:
+                self.file.flush()
+            else:
+                self.file.close()
+        self.file = None
+        self.writer = None
+
+    def close(self):
+        """Close an output file left open mid-result (error or Ctrl+C); what was written is kept."""
+        if self.file is not None and self.file is not sys.stdout:
+            self.file.close()
+        self.file = None
+        self.writer = None
+        self.store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run(args):
+    """Run one query / script; returns the process exit code."""
+    if args.query is not None:
+        query = args.query
+    elif args.file and args.file != "-":
+        with open(args.file, encoding="utf-8") as f:
+            query = f.read()
+    else:
+        query = sys.stdin.read()
+    if not query.strip():
+        log("Error: empty query")
+        return 2
+
+    if args.memory_budget:
+        set_memory_budget(args.memory_budget * 1024 * 1024)
+    timer = PhaseTimer()
+    writer = ResultWriter(args.out, timer)
+    worker = QueryWorker(get_conn_str(args.db), query, continue_on_error=args.continue_on_error,
+                         stats="stats" if args.stats else None, arrow=args.arrow).start()
+    start_time = time.time()
+    state = {"result_started": start_time, "failed_batches": 0, "status": 0}
+
+    def start_result(columns):
+        writer.start(columns)
+        state["result_started"] = time.time()
+
+    def end_result(row_total):
+        writer.end()
+        log(f"Result {writer.index}: {row_total:,} rows in {time.time() - state['result_started']:.3f}s")
+
+    def rowcount(affected):
+        if affected >= 0:
+            log(f"{affected} row(s) affected")
+
+    def messages(lines):
+        for message in lines:
+            log(message)
+
+    def batch_end(info):
+        if info["error"]:
+            state["failed_batches"] += 1
+            log(f"Batch {info['index']}/{info['total']} failed: {info['error']}")
+
+    def fail(error):
+        log(f"Error: {error}")
+        state["status"] = 1
+
+    handlers = {
+        "columns": start_result,
+        "rows": writer.rows,
+        "arrow_rows": lambda batch: writer.rows(batch, arrow=True),
+        "end_result": end_result,
+        "rowcount": rowcount,
+        "batch_start": lambda payload: log(f"Batch {payload[0]}/{payload[1]}…"),
+        "batch_end": batch_end,
+        "messages": messages,
+        "timings": timer.merge,
+        "error": fail,
+        "cancelled": lambda _: state.update(status=130),
+    }
+
+    try:
+        with writer:
+            while True:
+                try:
+                    event = worker.get(timeout=WAIT_INTERVAL_S)
+                except queue.Empty:
+                    continue
+                if dispatch(event, handlers):
+                    break
+    except KeyboardInterrupt:
+        # Stop the statement on the server, then let the worker wind down
+        log("Cancelling…")
+        worker.cancel()
+        worker.thread.join()
+        state["status"] = 130
+
+    pool.reset_pool()  # Close pooled connections before the interpreter tears down
+    if state["failed_batches"]:
+        state["status"] = state["status"] or 1
+    log(format_timings(timer.as_dict(), time.time() - start_time))
+    return state["status"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py", description="Run SQL without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="execute a query or script")
+    run_parser.add_argument("--db", default="test", help="database name (default: test)")
+    source = run_parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="script to run; GO separators are honoured ('-' = stdin)")
+    source.add_argument("--query", help="query text to run")
+    run_parser.add_argument("--out", help="output file (.csv or .xlsx); default: CSV on stdout")
+    run_parser.add_argument("--continue-on-error", action="store_true",
+                            help="keep running later GO batches after one fails")
+    run_parser.add_argument("--stats", action="store_true",
+                            help="print STATISTICS IO/TIME messages")
+    run_parser.add_argument("--memory-budget", type=int, metavar="MB",
+                            help="RAM for an .xlsx result before rows spill to disk")
+    run_parser.add_argument("--arrow", action="store_true",
+                            help="fetch through Arrow record batches (needs pyarrow)")
+
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
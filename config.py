@@ -12,7 +12,8 @@ DEFAULT_CONFIG = {
     "ai_provider": "groq",          # default to groq since you have the key
     "gemini_api_key": os.getenv("GEMINI_API_KEY"),
     "groq_api_key": os.getenv("GROQ_API_KEY"),
-    "ollama_url": "http://localhost:11434"  # local Ollama instance
+    "ollama_url": "http://localhost:11434",  # local Ollama instance
+    "memory_budget_mb": 1024  # RAM for result sets before new rows spill to disk
 }
 
 def load_config():
@@ -30,6 +31,7 @@ def load_config():
     config["gemini_api_key"] = config.get("gemini_api_key") or None
     config["groq_api_key"] = config.get("groq_api_key") or None
     config["ollama_url"] = config.get("ollama_url") or "http://localhost:11434"
+    config["memory_budget_mb"] = config.get("memory_budget_mb") or 1024
     
     return config
 
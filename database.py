@@ -1,22 +1,122 @@
-import pyodbc
-from tkinter import messagebox, ttk
+from tkinter import ttk
 import tkinter as tk
 import tkinter.font as tkfont
+import os
+import random
 
-def autosize_treeview_columns(tree, padding=20):
+import pool
+from backends import LOCAL_EXTENSIONS, backend_for, get_conn_str, local_conn_str
+from result_grid import VirtualGrid
+
+
+AUTOSIZE_SAMPLE_ROWS = 500  # Rows measured per autosize (first rows + random picks)
+AUTOSIZE_HEAD_ROWS = 200  # How many of those are the first rows
+AUTOSIZE_MAX_WIDTH = 400  # Column width cap in pixels
+FILTER_DELAY_MS = 250  # Quick filter applies this long after the last keystroke
+
+_width_cache = {}  # (font, string length) -> measured width
+
+
+def discover_databases(conn_str):
+    """
+    Database names offered by the server behind `conn_str` (sys.databases on
+    SQL Server). The connection it opens goes back to the pool, so it also
+    warms the pool for the first run.
+    """
+    conn = pool.checkout(conn_str)
+    try:
+        names = backend_for(conn_str).databases(conn)
+    except Exception:
+        pool.discard(conn)
+        raise
+    pool.checkin(conn_str, conn)
+    return names
+
+
+def local_database_files(folder="."):
+    """SQLite / DuckDB files in `folder`, for the database picker."""
+    try:
+        return sorted(name for name in os.listdir(folder)
+                      if os.path.splitext(name)[1].lower() in LOCAL_EXTENSIONS)
+    except OSError:
+        return []
+
+
+def get_tree_rows(tree):
     """
-    Auto-resize Treeview columns based on header and cell content.
+    Return every row of a result Treeview as a list of display strings.
+    Works for plain Treeviews and for VirtualGrid (which only has the visible rows as items).
     """
-    font = tkfont.Font()
+    if isinstance(tree, VirtualGrid):
+        return list(tree.iter_display_rows())
+    columns = tree["columns"]
+    return [[tree.set(child, col) for col in columns] for child in tree.get_children()]
 
-    for col in tree["columns"]:
-        max_width = font.measure(col)
 
-        for item in tree.get_children():
-            value = tree.set(item, col)
-            max_width = max(max_width, font.measure(str(value)))
+def tree_clipboard_text(tree):
+    """Tab-separated header + rows of a result Treeview, ready to paste into Excel."""
+    lines = ["\t".join(tree["columns"])]
+    for values in get_tree_rows(tree):
+        lines.append("\t".join("" if v is None else str(v) for v in values))
+    return "\n".join(lines)
 
-        tree.column(col, width=max_width + padding)
+
+def _sample_indices(total, sample_size):
+    """First rows plus random picks from the rest, at most `sample_size` indices."""
+    if total <= sample_size:
+        return range(total)
+    head = min(AUTOSIZE_HEAD_ROWS, sample_size)
+    picks = random.sample(range(head, total), sample_size - head)
+    return list(range(head)) + sorted(picks)
+
+
+def _measure(font, font_key, text, max_width):
+    """
+    Text width in pixels, cached per (font, string length).
+    Strings of the same length are assumed to render about as wide, so a
+    column of 100k dates or ids costs a handful of measure() calls.
+    """
+    if max_width:
+        # Anything longer than this cannot fit under the cap anyway
+        text = text[:max_width // 3]
+    key = (font_key, len(text))
+    width = _width_cache.get(key)
+    if width is None:
+        width = font.measure(text)
+        _width_cache[key] = width
+    return width
+
+
+def autosize_treeview_columns(tree, padding=20, sample_size=None, max_width=AUTOSIZE_MAX_WIDTH):
+    """
+    Auto-resize Treeview columns based on header and a sample of cell content.
+    Measures the header plus up to `sample_size` rows (first rows + random picks);
+    `max_width` caps a column so one huge NVARCHAR(MAX) value can't blow out the
+    layout (None = no cap).
+    """
+    sample_size = sample_size or AUTOSIZE_SAMPLE_ROWS
+    font_spec = ttk.Style().lookup("Treeview", "font") or "TkDefaultFont"
+    font = tkfont.Font(font=font_spec)
+    font_key = str(font_spec)
+
+    if isinstance(tree, VirtualGrid):
+        indices = _sample_indices(tree.row_count(), sample_size)
+        rows = [tree.display_row(i) for i in indices]
+    else:
+        children = tree.get_children()
+        columns = tree["columns"]
+        indices = _sample_indices(len(children), sample_size)
+        rows = [[tree.set(children[i], col) for col in columns] for i in indices]
+
+    for index, col in enumerate(tree["columns"]):
+        width = font.measure(col)
+
+        for values in rows:
+            width = max(width, _measure(font, font_key, str(values[index]), max_width))
+
+        if max_width:
+            width = min(width, max_width)
+        tree.column(col, width=width + padding)
 
 
 def create_scrollable_tree(parent, columns):
@@ -50,100 +150,65 @@ def create_scrollable_tree(parent, columns):
 
     return tree
 
-def execute_query(query, results_notebook, conn_str):
-    if not query.strip():
-        messagebox.showwarning("Warning", "Enter a query first!")
-        return
-
-    # Clear existing result tabs EXCEPT History
-    for tab in results_notebook.winfo_children():
-        tab_index = results_notebook.index(tab)
-        tab_name = results_notebook.tab(tab_index, "text")
-        if tab_name != "History":
-            tab.destroy()
-    try:
-        conn = pyodbc.connect(conn_str, autocommit=True)
-        cursor = conn.cursor()
-
-        cursor.execute(query)
-
-        result_count = 0
-        has_any_result = False
-
-        while True:
-            has_any_result = True
-            result_count += 1
-
-            tab_frame = ttk.Frame(results_notebook)
-
-            # ---------------- SELECT queries ----------------
-            if cursor.description:
-                cols = [column[0] for column in cursor.description]
-                results_notebook.add(tab_frame, text=f"Result {result_count}")
-
-                tree = create_scrollable_tree(tab_frame, cols)
-
-                for col in cols:
-                    tree.heading(col, text=col)
-                    tree.column(col, anchor="center", width=120)
-
-                rows = cursor.fetchall()
-
-                if rows:
-                    for i, row in enumerate(rows):
-                        values = ["" if val is None else str(val) for val in row]
-                        tag = "even" if i % 2 == 0 else "odd"
-                        tree.insert("", "end", values=values, tags=(tag,))
-                    autosize_treeview_columns(tree)
-
-                    tree.tag_configure("even", background="#f9f9f9")
-                    tree.tag_configure("odd", background="#ffffff")
-                else:
-                    tree.insert(
-                        "",
-                        "end",
-                        values=["(No rows returned)"] + [""] * (len(cols) - 1)
-                    )
-
-            # ---------------- Non-SELECT queries ----------------
-            else:
-                affected = cursor.rowcount if cursor.rowcount >= 0 else "unknown"
-                results_notebook.add(tab_frame, text=f"Query {result_count}")
-
-                tree = create_scrollable_tree(tab_frame, ("Message",))
-                tree.heading("Message", text="Execution Result")
-                tree.column("Message", anchor="w", width=600)
-
-                tree.insert(
-                    "",
-                    "end",
-                    values=(f"Success: {affected} row(s) affected",)
-                )
-                autosize_treeview_columns(tree)
-
-            if not cursor.nextset():
-                break
-
-        cursor.close()
-        conn.close()
-
-        if not has_any_result:
-            tab_frame = ttk.Frame(results_notebook)
-            results_notebook.add(tab_frame, text="Result")
-
-            tree = create_scrollable_tree(tab_frame, ("Message",))
-            tree.heading("Message", text="Info")
-            tree.column("Message", anchor="w", width=600)
-            tree.insert("", "end", values=("Query executed successfully.",))
-
-    # ---------------- Error handling ----------------
-    except Exception as e:
-        tab_frame = ttk.Frame(results_notebook)
-        results_notebook.add(tab_frame, text="Error")
-
-        tree = create_scrollable_tree(tab_frame, ("Error",))
-        tree.heading("Error", text="SQL Error")
-        tree.column("Error", anchor="w", width=900)
-
-        tree.insert("", "end", values=(str(e),))
-        autosize_treeview_columns(tree)
\ No newline at end of file
+
+def create_virtual_grid(parent, columns, types=None, store=None):
+    """
+    Create a VirtualGrid (viewport-only Treeview) with both scrollbars and a
+    quick-filter box above it (header clicks sort).
+    `types` are the DB-API type codes of the columns, used to pick typed storage;
+    pass `store` to show an already filled ResultStore (e.g. from the result cache).
+    The vertical scrollbar is driven by the grid's backing store, not by its items.
+    Returns the VirtualGrid widget.
+    """
+    filter_bar = ttk.Frame(parent)
+    filter_bar.pack(fill="x", padx=2, pady=(2, 0))
+    container = ttk.Frame(parent)
+    container.pack(fill="both", expand=True)
+
+    tree = VirtualGrid(container, columns, types, store)
+
+    ttk.Label(filter_bar, text="Filter:").pack(side="left")
+    filter_var = tk.StringVar()
+    filter_entry = ttk.Entry(filter_bar, textvariable=filter_var, width=30)
+    filter_entry.pack(side="left", padx=(4, 8))
+    view_label = ttk.Label(filter_bar, text="", foreground="#555555")
+    view_label.pack(side="left")
+    pending = {"after": None}
+
+    def show_view_count():
+        if tree.filter_text:
+            view_label.config(text=f"{tree.row_count():,} of {len(tree.store):,} rows")
+        else:
+            view_label.config(text="")
+
+    def apply_filter():
+        pending["after"] = None
+        tree.set_filter(filter_var.get())
+
+    def on_filter_change(*_):
+        if pending["after"]:
+            filter_entry.after_cancel(pending["after"])
+        pending["after"] = filter_entry.after(FILTER_DELAY_MS, apply_filter)
+
+    def clear_filter(event):
+        filter_var.set("")
+        return "break"  # Don't let the window's Escape binding cancel a running query
+
+    filter_var.trace_add("write", on_filter_change)
+    filter_entry.bind("<Escape>", clear_filter)
+    tree.on_view_change = show_view_count
+
+    y_scroll = ttk.Scrollbar(container, orient="vertical", command=tree.yview)
+    x_scroll = ttk.Scrollbar(container, orient="horizontal", command=tree.xview)
+
+    tree.configure(xscrollcommand=x_scroll.set)
+    tree.yscroll = y_scroll.set
+
+    tree.grid(row=0, column=0, sticky="nsew")
+    y_scroll.grid(row=0, column=1, sticky="ns")
+    x_scroll.grid(row=1, column=0, sticky="ew")
+
+    container.grid_rowconfigure(0, weight=1)
+    container.grid_columnconfigure(0, weight=1)
+
+    return tree
@@ -47,6 +47,8 @@ def get_error_from_results(results_notebook):
         tab_name = results_notebook.tab(tab_id, "text")
         if tab_name == "Error":
             tab_frame = results_notebook.nametowidget(tab_id)
+            if getattr(tab_frame, "error_message", None):
+                return tab_frame.error_message
             for child in tab_frame.winfo_children():
                 if isinstance(child, ttk.Treeview):
                     # Get all values from the treeview
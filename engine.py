@@ -0,0 +1,393 @@
+# engine.py
+"""
+Query execution engine: the one place that connects, executes, streams and
+cancels. Runs connect / execute / fetch on a background thread and hands the
+results back as (kind, payload) events through a queue, so the Tk window
+never freezes while the server works. The GUI (main.py) and the headless
+runner (cli.py) consume the same events through `dispatch`.
+"""
+
+import queue
+import re
+import threading
+import time
+
+import arrow_fetch
+import pool
+from backends import backend_for
+from query_params import bind_parameters
+from sql_text import split_batches
+from timing import PhaseTimer
+
+FETCH_BATCH_SIZE = 500  # Rows pulled per cursor.fetchmany() call
+FIRST_BATCH_SIZE = 100  # Smaller first batch so the first page shows right away
+PREFETCH_ROWS = 200_000  # Rows a worker may fetch ahead of its consumer (across result sets)
+
+SHOWPLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+
+# "Run with stats" modes: session options switched on around the user's query
+STATS_ON = {
+    "stats": "SET STATISTICS IO, TIME ON",
+    "plan": "SET STATISTICS IO, TIME, XML ON",
+}
+STATS_OFF = "SET STATISTICS IO, TIME, XML OFF"
+
+END_EVENTS = ("done", "error", "cancelled")  # A QueryWorker run has ended
+
+
+class QueryCancelled(Exception):
+    """Raised inside the worker when the user cancelled the running query."""
+
+
+def dispatch(event, handlers):
+    """
+    Hand a (kind, payload) event to handlers[kind](payload); kinds without a
+    handler are skipped. Returns True if the event ended the run (END_EVENTS).
+    """
+    kind, payload = event
+    handler = handlers.get(kind)
+    if handler is not None:
+        handler(payload)
+    return kind in END_EVENTS
+
+
+def is_showplan(columns):
+    """True if a result set is the showplan produced by SET STATISTICS XML ON."""
+    return len(columns) == 1 and columns[0] == SHOWPLAN_COLUMN
+
+
+def _message_events(cursor):
+    """Info messages (PRINT, STATISTICS IO/TIME) the driver attached to the current result."""
+    messages = getattr(cursor, "messages", None)  # pyodbc >= 4.0.31
+    if messages:
+        # Drop the "[01000] (0)" state and "[Microsoft][ODBC Driver ...]" prefixes
+        yield ("messages", [re.sub(r"^(\[[^\]]*\])+", "", str(text)) for _, text in messages])
+
+
+def iter_result_events(cursor, fetch_size=FETCH_BATCH_SIZE, timer=None, arrow=False):
+    """
+    Walk every result set of an executed cursor and yield (kind, payload) events:
+      ("columns", [(name, type_code)])  a new result set starts
+      ("rows", [row, ...])        a batch of rows for the current result set
+      ("arrow_rows", RecordBatch) the same as a pyarrow record batch (arrow=True)
+      ("end_result", row_count)   the current result set is complete
+      ("rowcount", affected)      a non-SELECT statement finished
+      ("plan", xml_text)          a showplan result set (not rendered as a grid)
+      ("messages", [text, ...])   info messages from the server
+    Rows are streamed with cursor.fetchmany(), so only one batch is held
+    here at a time and the first rows reach the UI before the fetch ends.
+    Driver time is added to `timer` (a PhaseTimer): the first fetch of each
+    result set and nextset() count as "first_row", later fetches as "fetch".
+    With `arrow`, cursors switched to Arrow (see backends.StatementCursor.use_arrow)
+    deliver rows as record batches.
+    """
+    timer = timer or PhaseTimer()
+    while True:
+        yield from _message_events(cursor)
+
+        if cursor.description and is_showplan([column[0] for column in cursor.description]):
+            with timer.measure("fetch"):
+                plan_rows = cursor.fetchall()
+            for row in plan_rows:
+                yield ("plan", row[0])
+        elif cursor.description:
+            yield ("columns", [(column[0], column[1]) for column in cursor.description])
+
+            if arrow and getattr(cursor, "arrow_size", None):
+                row_total = yield from _iter_arrow_batches(cursor.arrow_batches(), timer)
+                yield ("end_result", row_total)
+            else:
+                row_total = 0
+                batch_size = min(FIRST_BATCH_SIZE, fetch_size)
+                phase = "first_row"
+                while True:
+                    with timer.measure(phase):
+                        rows = cursor.fetchmany(batch_size)
+                    phase = "fetch"
+                    if not rows:
+                        break
+                    row_total += len(rows)
+                    yield ("rows", rows)
+                    batch_size = fetch_size
+                yield ("end_result", row_total)
+        else:
+            yield ("rowcount", cursor.rowcount)
+
+        with timer.measure("first_row"):
+            more = cursor.nextset()
+        if not more:
+            yield from _message_events(cursor)
+            break
+
+
+def _iter_arrow_batches(batches, timer):
+    """Yield an "arrow_rows" event per non-empty record batch; returns the row count."""
+    row_total = 0
+    phase = "first_row"
+    while True:
+        with timer.measure(phase):
+            batch = next(batches, None)
+        phase = "fetch"
+        if batch is None:
+            return row_total
+        if len(batch):
+            row_total += len(batch)
+            yield ("arrow_rows", batch)
+
+
+def iter_arrow_odbc_events(conn_str, query, timer):
+    """
+    Run `query` through arrow-odbc, which fetches straight into Arrow buffers
+    (no per-row Python objects). It opens its own connection, outside the
+    pool, and a cancel only takes effect between batches.
+    """
+    with timer.measure("connect"):
+        reader = arrow_fetch.odbc_reader(conn_str, query)
+    while True:
+        if reader is None:
+            yield ("rowcount", -1)
+            break
+        yield ("columns", arrow_fetch.columns(reader.schema))
+        row_total = yield from _iter_arrow_batches(iter(reader), timer)
+        yield ("end_result", row_total)
+        with timer.measure("first_row"):
+            more = arrow_fetch.more_results(reader)
+        if not more:
+            break
+
+
+def iter_batch_events(cursor, batches, continue_on_error=False, should_stop=None, timer=None, arrow=False):
+    """
+    Execute `batches` one after another on `cursor`, yielding their result events
+    wrapped in progress events (a batch is its SQL text, or an (sql, params)
+    pair when it has `?` markers):
+      ("batches", total)                         before the first batch
+      ("batch_start", (n, total, sql))           batch n is about to run
+      ("batch_end", {"index", "total", "elapsed", "rows", "error"})
+    A failing batch is reported in its batch_end event; the error is then raised
+    unless `continue_on_error`. `should_stop()` is checked between batches.
+    """
+    timer = timer or PhaseTimer()
+    total = len(batches)
+    yield ("batches", total)
+
+    for n, batch in enumerate(batches, start=1):
+        sql, params = batch if isinstance(batch, tuple) else (batch, None)
+        if should_stop and should_stop():
+            raise QueryCancelled()
+        yield ("batch_start", (n, total, sql))
+
+        started = time.time()
+        rows = 0
+        error = None
+        try:
+            with timer.measure("first_row"):
+                _execute(cursor, sql, params)
+            for event in iter_result_events(cursor, timer=timer, arrow=arrow):
+                kind, payload = event
+                if kind == "end_result" or (kind == "rowcount" and payload > 0):
+                    rows += payload
+                yield event
+        except Exception as e:
+            if should_stop and should_stop():
+                raise
+            error = e
+
+        yield ("batch_end", {
+            "index": n,
+            "total": total,
+            "elapsed": time.time() - started,
+            "rows": rows,
+            "error": None if error is None else str(error),
+        })
+        if error is not None and not continue_on_error:
+            raise error
+
+
+def _execute(cursor, sql, params=None):
+    if params:
+        cursor.execute(sql, params)
+    else:
+        cursor.execute(sql)
+
+
+def iter_query_events(conn_str, query, on_cursor=None, params=None,
+                      continue_on_error=False, should_stop=None, stats=None, arrow=False):
+    """
+    Check out a pooled connection, execute `query` and yield the events of
+    `iter_result_events`. `params` is a list of values for the `?` markers
+    of a single statement, or a dict of values for the `@name` placeholders
+    of a query or script (see query_params). Parameterized statements run on
+    the connection's prepared cursor for that SQL, so repeat runs skip the
+    prepare. Scripts with GO separators run batch by batch through `iter_batch_events`.
+    `stats` ("stats" or "plan", see STATS_ON) turns on STATISTICS output for the run.
+    `arrow` fetches through Arrow record batches where the backend allows it;
+    a plain SQL Server query then goes through arrow-odbc if it is installed.
+    `on_cursor(cursor)` is called before executing, so another thread can
+    keep a handle for `cursor.cancel()`.
+    After a clean run a final ("timings", {phase: seconds}) event reports the
+    connect / first_row / fetch time spent in the driver.
+    Database errors are raised to the caller.
+    """
+    if isinstance(params, dict):
+        batches = [bind_parameters(batch, params) for batch in split_batches(query)]
+    elif params:
+        batches = [(query, params)]
+    else:
+        batches = [(batch, None) for batch in split_batches(query)]
+    if not backend_for(conn_str).stats:
+        stats = None  # SET STATISTICS is SQL Server only
+    single = batches[0] if len(batches) == 1 else None
+
+    timer = PhaseTimer()
+    if (arrow and backend_for(conn_str).name == "mssql" and arrow_fetch.odbc_available()
+            and single and not single[1] and not stats):
+        yield from iter_arrow_odbc_events(conn_str, single[0], timer)
+        yield ("timings", timer.as_dict())
+        return
+
+    with timer.measure("connect"):
+        conn = pool.checkout(conn_str)
+    healthy = False
+    # SET STATISTICS on the same cursor would replace its prepared statement
+    prepared = bool(single and single[1] and not stats)
+    try:
+        cursor = pool.prepared_cursor(conn, single[0]) if prepared else conn.cursor()
+        if on_cursor:
+            on_cursor(cursor)
+        if arrow and getattr(cursor, "supports_arrow", False):
+            cursor.use_arrow(arrow_fetch.ARROW_BATCH_SIZE)
+        if stats:
+            cursor.execute(STATS_ON[stats])
+        if len(batches) > 1:
+            yield from iter_batch_events(cursor, batches, continue_on_error, should_stop, timer, arrow)
+        elif single:
+            with timer.measure("first_row"):
+                _execute(cursor, *single)
+            yield from iter_result_events(cursor, timer=timer, arrow=arrow)
+        if stats:
+            # Pooled connections keep session options, so switch them back off
+            cursor.execute(STATS_OFF)
+        if not prepared:
+            cursor.close()  # The prepared cursor stays with its connection
+        healthy = True
+        yield ("timings", timer.as_dict())
+    finally:
+        # Only connections that completed cleanly go back to the pool
+        if healthy:
+            pool.checkin(conn_str, conn)
+        else:
+            pool.discard(conn)
+
+
+def _event_rows(event):
+    """Rows carried by a rows / arrow_rows event (0 for anything else)."""
+    kind, payload = event
+    if kind == "rows":
+        return len(payload)
+    if kind == "arrow_rows":
+        return payload.num_rows
+    return 0
+
+
+class QueryWorker:
+    """
+    Run a query on a daemon thread.
+    Events from `iter_query_events` are put on `self.events`, followed by
+    ("done", None) on success, ("cancelled", None) after `cancel()`, or
+    ("error", exception) on failure. Consume them with poll() / get().
+    The worker keeps fetching - on into the next result sets of a script -
+    while the consumer renders, until `prefetch_rows` rows are waiting
+    unconsumed; then it pauses until the consumer catches up, so a script
+    takes about as long as its slowest stage without buffering everything.
+    """
+
+    def __init__(self, conn_str, query, params=None, continue_on_error=False, stats=None, arrow=False,
+                 prefetch_rows=PREFETCH_ROWS):
+        self.conn_str = conn_str
+        self.query = query
+        self.params = params
+        self.continue_on_error = continue_on_error
+        self.stats = stats
+        self.arrow = arrow
+        self.events = queue.Queue()
+        self.prefetch_rows = prefetch_rows
+        self.buffered_rows = 0  # Rows put on `events` and not yet taken by the consumer
+        self.buffer_space = threading.Condition()
+        self.cursor = None
+        self.cancel_requested = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the server to stop the in-flight statement (safe to call from the UI thread)."""
+        self.cancel_requested.set()
+        with self.buffer_space:
+            self.buffer_space.notify_all()  # Wake a worker waiting for buffer space
+        cursor = self.cursor
+        if cursor is not None:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass  # Statement already finished or connection gone
+
+    def _register_cursor(self, cursor):
+        self.cursor = cursor
+        if self.cancel_requested.is_set():
+            raise QueryCancelled()
+
+    def _put(self, event):
+        """Queue an event, first waiting while the prefetch buffer is full."""
+        rows = _event_rows(event)
+        if rows:
+            with self.buffer_space:
+                while self.buffered_rows >= self.prefetch_rows:
+                    if self.cancel_requested.is_set():
+                        raise QueryCancelled()
+                    self.buffer_space.wait()
+                self.buffered_rows += rows
+        self.events.put(event)
+
+    def _taken(self, event):
+        rows = _event_rows(event)
+        if rows:
+            with self.buffer_space:
+                self.buffered_rows -= rows
+                self.buffer_space.notify_all()
+        return event
+
+    def _run(self):
+        try:
+            events = iter_query_events(self.conn_str, self.query, self._register_cursor, self.params,
+                                       self.continue_on_error, self.cancel_requested.is_set, self.stats,
+                                       self.arrow)
+            for event in events:
+                if self.cancel_requested.is_set():
+                    raise QueryCancelled()
+                self._put(event)
+            self.events.put(("done", None))
+        except Exception as e:
+            # After cancel() the driver reports "Operation canceled" as an error
+            if self.cancel_requested.is_set():
+                self.events.put(("cancelled", None))
+            else:
+                self.events.put(("error", e))
+        finally:
+            self.cursor = None
+
+    def poll(self, max_events=50):
+        """Return up to `max_events` pending events without blocking."""
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self._taken(self.events.get_nowait()))
+            except queue.Empty:
+                break
+        return events
+
+    def get(self, timeout=None):
+        """Next event, blocking up to `timeout` seconds (raises queue.Empty)."""
+        return self._taken(self.events.get(timeout=timeout))
@@ -4,24 +4,36 @@ import pandas as pd
 from tkinter import filedialog, messagebox, Toplevel, Radiobutton, Button, Label, StringVar, Frame
 import tkinter as tk  # Make sure tk is imported for Frame
 
+from database import get_tree_rows
+from result_grid import VirtualGrid
+from result_store import save_dataframe, store_dataframe
+
 def export_results(tree):
-    """Export Treeview results to CSV or Excel with a radio button dialog."""
+    """Export Treeview / result grid contents to CSV or Excel with a radio button dialog."""
     # --- Extract data ---
     columns = tree["columns"]
     if not columns:
         messagebox.showwarning("No Data", "No columns available to export!")
         return
 
-    data = []
-    for child in tree.get_children():
-        values = tree.item(child)['values']
-        data.append(values)
+    if isinstance(tree, VirtualGrid):
+        # Typed values straight from the columnar store (numbers stay numbers)
+        store = tree.store
+        if not len(store):
+            messagebox.showwarning("No Data", "No rows available to export!")
+            return
+        df = store_dataframe(store)
+        if tree.view is not None:
+            # Sorted / filtered in the grid: export what is shown, in that order
+            df = df.iloc[tree.view]
+    else:
+        data = get_tree_rows(tree)
 
-    if not data:
-        messagebox.showwarning("No Data", "No rows available to export!")
-        return
+        if not data:
+            messagebox.showwarning("No Data", "No rows available to export!")
+            return
 
-    df = pd.DataFrame(data, columns=columns)
+        df = pd.DataFrame(data, columns=columns)
 
     # --- Create dialog window ---
     dialog = Toplevel(tree.winfo_toplevel())
@@ -98,10 +110,7 @@ def export_results(tree):
 
     # --- Export ---
     try:
-        if format_type == "csv":
-            df.to_csv(file_path, index=False)
-        else:
-            df.to_excel(file_path, index=False, engine="openpyxl")
+        save_dataframe(df, file_path, format_type)
         messagebox.showinfo("Success", f"Exported successfully!\n{file_path}")
     except Exception as e:
         messagebox.showerror("Error", f"Failed to export:\n{str(e)}")
\ No newline at end of file
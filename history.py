@@ -24,12 +24,13 @@ def save_history():
     with open(HISTORY_FILE, "w") as f:
         json.dump(current_history, f, indent=4)
 
-def add_history_entry(query, result_type, result_info):
+def add_history_entry(query, result_type, result_info, timings=None):
     """
     Add a new history entry
     query: SQL query text
-    result_type: 'success' or 'error'
+    result_type: 'success', 'error' or 'cancelled'
     result_info: e.g., '150 rows' or error message
+    timings: optional {phase: seconds} breakdown of the run
     """
     global current_history
     
@@ -39,6 +40,8 @@ def add_history_entry(query, result_type, result_info):
         "result_type": result_type,
         "result_info": result_info
     }
+    if timings:
+        entry["timings"] = timings
     
     # Add to beginning (most recent first)
     current_history.insert(0, entry)
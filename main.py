@@ -1,8 +1,9 @@
-import pyodbc
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, simpledialog, ttk
 import ctypes
 import re  # for syntax highlighting
+import threading
+import time
 
 # Import your custom modules
 from history import load_history, add_history_entry, clear_history, delete_history_entry, get_history
@@ -20,7 +21,22 @@ from debug_ai import show_ai_options_window, update_ai_status
 from settings import open_settings
 
 # Import display helpers
-from database import create_scrollable_tree, autosize_treeview_columns
+from database import (create_scrollable_tree, create_virtual_grid, autosize_treeview_columns, get_conn_str,
+                      tree_clipboard_text, discover_databases, local_database_files)
+from engine import END_EVENTS, QueryWorker, dispatch
+from backends import backend_for, local_conn_str
+import arrow_fetch
+import pool
+import result_cache
+import schema_catalog
+from paging import PagedQuery, can_page
+from plan_view import add_plan_tab
+from timing import PhaseTimer, format_timings
+from result_diff import diff_stores, add_diff_tab
+from query_params import find_parameters, parse_value
+from autocomplete import CompletionPopup
+from result_store import set_memory_budget
+from config import load_config
 
 # HIGH-DPI AWARENESS
 try:
@@ -170,156 +186,548 @@ def refresh_snippet_list():
 # Dynamic connection string
 current_db = "test"  # default
 
-def get_conn_str(db_name):
-    return (
-        "DRIVER={ODBC Driver 18 for SQL Server};"
-        "SERVER=localhost\\SQLEXPRESS;"
-        f"DATABASE={db_name};"
-        "Trusted_Connection=yes;"
-        "Encrypt=yes;"
-        "TrustServerCertificate=yes;"
-    )
-
 conn_str = get_conn_str(current_db)
 
 # ... existing imports and DPI settings ...
 
 current_db = "test"  # existing line
 is_running_query = False  # <--- ADD THIS LINE HERE
+current_worker = None  # QueryWorker for the query in flight
+run_state = {}  # Rendering state of the query in flight
+status_timings = None  # (timings, total) of the last run, shown on hover
+timings_tip = None  # Hover panel with the timing breakdown
+last_run_stores = []  # ResultStores of the latest completed run (Compare with Previous)
+previous_run_stores = []  # ... and of the run before it
+param_names = []  # @name placeholders shown in the parameter panel
+param_vars = {}  # Lowercased name -> StringVar; values survive edits and snippet switches
+POLL_INTERVAL_MS = 30  # How often the UI drains worker events
+POLL_BUDGET_S = 0.05  # Max time spent rendering per drain, keeps the window responsive
+SCHEMA_POLL_MS = 1000  # How often the status bar checks the schema catalog
+known_databases = []  # sys.databases names, listed in the background at startup (Change DB picker)
+RUN_MODES = {  # Run mode picker -> QueryWorker stats option
+    "Normal": None,
+    "Paged": None,
+    "With stats": "stats",
+    "With stats + plan": "plan",
+}
+
 def run_current_query(event=None):
-    global is_running_query
-    is_running_query = True
-    import time
-    start_time = time.time()
+    global is_running_query, current_worker, run_state
+    if is_running_query:
+        return "break"
 
     query = query_text.get("1.0", "end-1c").strip()
     if not query:
         messagebox.showwarning("Empty Query", "Please enter a query.")
-        is_running_query = False
         return
     
     # Clear existing result tabs EXCEPT History
     for tab_id in results_notebook.tabs():
         tab_name = results_notebook.tab(tab_id, "text")
         if tab_name != "History":
-            results_notebook.forget(tab_id)
-    
-    try:
-        conn = pyodbc.connect(conn_str, autocommit=True)
-        cursor = conn.cursor()
-        cursor.execute(query)
-        
-        result_count = 0
-        has_any_result = False
-        row_count = 0  # Total rows for status bar
-        result_infos = []  # Collect info for history
-        
-        while True:
-            has_any_result = True
-            result_count += 1
-            
+            close_result_tab(tab_id)
+
+    # @name placeholders are sent as parameters, not pasted into the SQL. The panel
+    # follows the editor 200 ms after a keystroke, so catch up before reading it
+    refresh_parameter_panel()
+    names = find_parameters(query)
+    params = None
+    if names:
+        params = {}
+        for name in names:
+            var = param_vars.get(name.lower())
+            params[name] = parse_value(var.get()) if var is not None else None
+
+    # Stats, plan and paged runs need the server, so only Normal runs read the cache
+    if cache_results_var.get() and run_mode_var.get() == "Normal" and result_cache.is_read_only(query):
+        entry = result_cache.get(query, current_db, params)
+        if entry is not None:
+            show_cached_results(query, entry)
+            return "break"
+
+    # Paged mode: run the SELECT one page at a time on the server
+    pager = None
+    if run_mode_var.get() == "Paged":
+        reason = can_page(query) if backend_for(conn_str).paging else "Paged mode needs SQL Server."
+        if params:
+            reason = "Paged mode doesn't support @parameters."
+        if reason:
+            messagebox.showwarning("Paged Mode", f"{reason}\nRunning the query normally.")
+        else:
+            pager = PagedQuery(query)
+
+    is_running_query = True
+    run_state = {
+        "query": query,
+        "params": params,
+        "start_time": time.time(),
+        "result_count": 0,
+        "row_count": 0,  # Total rows for status bar
+        "result_infos": [],  # Collect info for history
+        "tree": None,  # Treeview of the result set being filled
+        "tree_rows": 0,
+        "tabs": [],  # Result tabs built by this run (discarded on cancel)
+        "stores": [],  # ResultStores of finished result sets (for the result cache)
+        "cancel_time": None,
+        "pager": pager,
+        "batch_tree": None,  # Per-batch progress rows for GO-separated scripts
+        "batch_items": {},
+        "batch_errors": 0,
+        # STATISTICS IO/TIME (and XML plan) for this run; SQL Server only
+        "stats": RUN_MODES[run_mode_var.get()] if backend_for(conn_str).stats else None,
+        "plans": [],
+        "messages": [],
+        "timer": PhaseTimer(),  # Per-phase breakdown for the status bar and history
+    }
+    status_exec_label.config(text="Running…")
+    cancel_button.config(state=tk.NORMAL)
+    status_rows_label.config(text="Rows: -", fg="#ecf4f4")
+
+    # connect / execute / fetch happen on the worker thread
+    if pager:
+        current_worker = QueryWorker(conn_str, *pager.next_page()).start()
+    else:
+        current_worker = QueryWorker(conn_str, query, params, continue_on_error=continue_on_error_var.get(),
+                                     stats=run_state["stats"], arrow=arrow_fetch_var.get()).start()
+    root.after(POLL_INTERVAL_MS, poll_query_worker)
+    return "break"
+
+def poll_query_worker():
+    """Drain events from the worker and render them; reschedules itself until the run ends."""
+    if current_worker is None:
+        return
+
+    deadline = time.time() + POLL_BUDGET_S
+    while time.time() < deadline:
+        events = current_worker.poll(max_events=4)
+        if not events:
+            break
+        if handle_worker_events(events):
+            return  # Run finished
+
+    if run_state["cancel_time"] is None:
+        elapsed = time.time() - run_state["start_time"]
+        fetched = run_state["row_count"] + run_state["tree_rows"]
+        status_exec_label.config(text=f"Running… {elapsed:.1f}s, {fetched:,} rows fetched so far")
+    root.after(POLL_INTERVAL_MS, poll_query_worker)
+
+def run_event_handlers():
+    """Engine event kind -> how the GUI renders it, for the current run"""
+    return {
+        "columns": start_result_tab,
+        "rows": append_result_rows,
+        "arrow_rows": lambda batch: append_result_rows(batch, arrow=True),
+        "end_result": finish_result_tab,
+        "rowcount": add_rowcount_tab,
+        "batches": start_batch_progress,
+        "batch_start": lambda payload: show_batch_started(*payload),
+        "batch_end": show_batch_finished,
+        "plan": run_state["plans"].append,
+        "messages": run_state["messages"].extend,
+        "timings": run_state["timer"].merge,  # connect / first_row / fetch from the worker
+        "done": lambda _: finish_query_run(),
+        "error": fail_query_run,
+        "cancelled": lambda _: finish_cancelled_run(),
+    }
+
+def handle_worker_events(events):
+    """Render a batch of worker events; returns True once the run has ended."""
+    handlers = run_event_handlers()
+    for event in events:
+        if run_state["cancel_time"] is not None:
+            # Cancel requested: stop rendering, wait for the worker to wind down
+            if event[0] in END_EVENTS:
+                finish_cancelled_run()
+                return True
+            continue
+        if dispatch(event, handlers):
+            return True
+    return False
+
+def cancel_current_query(event=None):
+    """Cancel the in-flight statement via cursor.cancel() (Cancel button / Escape)"""
+    if not is_running_query or current_worker is None:
+        return
+    if run_state["cancel_time"] is None:
+        run_state["cancel_time"] = time.time()  # Execution time is measured up to here
+        status_exec_label.config(text="Cancelling…")
+        current_worker.cancel()
+    return "break"
+
+def show_cached_results(query, entry):
+    """Render a cached run from memory instead of going to the server"""
+    start_time = time.time()
+    row_count = 0
+    result_infos = []
+    timer = PhaseTimer()
+
+    for index, store in enumerate(entry["stores"], start=1):
+        with timer.measure("render"):
             tab_frame = ttk.Frame(results_notebook)
-            
-            # ---------------- SELECT queries ----------------
-            if cursor.description:
-                cols = [column[0] for column in cursor.description]
-                results_notebook.add(tab_frame, text=f"Result {result_count}")
-                
-                tree = create_scrollable_tree(tab_frame, cols)
-                
-                for col in cols:
-                    tree.heading(col, text=col)
-                    tree.column(col, anchor="center", width=120)
-                
-                rows = cursor.fetchall()
-                result_infos.append(f"{len(rows)} rows")
-                row_count += len(rows)
-                
-                if rows:
-                    for i, row in enumerate(rows):
-                        values = ["" if val is None else str(val) for val in row]
-                        tag = "even" if i % 2 == 0 else "odd"
-                        tree.insert("", "end", values=values, tags=(tag,))
-                    autosize_treeview_columns(tree)
-                    
-                    tree.tag_configure("even", background="#f9f9f9")
-                    tree.tag_configure("odd", background="#ffffff")
-                else:
-                    tree.insert(
-                        "",
-                        "end",
-                        values=["(No rows returned)"] + [""] * (len(cols) - 1)
-                    )
-            
-            # ---------------- Non-SELECT queries ----------------
+            results_notebook.add(tab_frame, text=f"Result {index}")
+            tree = create_virtual_grid(tab_frame, store.columns, store=store)
+            for col in store.columns:
+                tree.heading(col, text=col)
+                tree.column(col, anchor="center", width=120)
+            if len(store):
+                tree.refresh()
             else:
-                affected = cursor.rowcount if cursor.rowcount >= 0 else "unknown"
-                result_infos.append(f"{affected} row(s) affected")
-                if affected != "unknown":
-                    row_count += affected
-                
-                results_notebook.add(tab_frame, text=f"Query {result_count}")
-                
-                tree = create_scrollable_tree(tab_frame, ("Message",))
-                tree.heading("Message", text="Execution Result")
-                tree.column("Message", anchor="w", width=600)
-                
-                tree.insert(
-                    "",
-                    "end",
-                    values=(f"Success: {affected} row(s) affected",)
-                )
+                tree.show_placeholder("(No rows returned)")
+        if len(store):
+            with timer.measure("autosize"):
                 autosize_treeview_columns(tree)
-            
-            if not cursor.nextset():
-                break
-        
-        cursor.close()
-        conn.close()
-        
-        if not has_any_result:
-            tab_frame = ttk.Frame(results_notebook)
-            results_notebook.add(tab_frame, text="Result")
-            
-            tree = create_scrollable_tree(tab_frame, ("Message",))
-            tree.heading("Message", text="Info")
-            tree.column("Message", anchor="w", width=600)
-            tree.insert("", "end", values=("Query executed successfully.",))
-            
-            result_infos.append("executed successfully")
-        
-        # Add to history (join infos if multiple results)
-        result_info = "; ".join(result_infos) if result_infos else "executed"
-        execution_time = time.time() - start_time
-        add_history_entry(query, "success", result_info)
-        refresh_history_list()
-        update_status_bar(f"Executed in {execution_time:.3f}s", row_count, "success")
-        
-        # Select first result tab (index 0, since History is at the end)
-        if results_notebook.index("end") > 1:  # More than just History
-            results_notebook.select(1)
-
-    # ---------------- Error handling ----------------
-    except Exception as e:
-        execution_time = time.time() - start_time
-        add_history_entry(query, "error", str(e)[:100])
-        refresh_history_list()
-        update_status_bar(f"Error in {execution_time:.3f}s", 0, "error")
-        
+        row_count += len(store)
+        result_infos.append(f"{len(store)} rows")
+
+    remember_run_stores(entry["stores"])
+    age = time.time() - entry["created"]
+    execution_time = time.time() - start_time
+    add_history_entry(query, "success", "; ".join(result_infos) + " (cached)", timer.as_dict())
+    refresh_history_list()
+    update_status_bar(f"Executed in {execution_time:.3f}s (cached, age {age:.0f}s)", row_count, "success",
+                      timer.as_dict(), execution_time)
+
+    if results_notebook.index("end") > 1:  # More than just History
+        results_notebook.select(1)
+
+def start_result_tab(columns):
+    """Create the tab and grid for a new SELECT result set"""
+    cols = [name for name, _ in columns]
+    run_state["result_count"] += 1
+    with run_state["timer"].measure("render"):
         tab_frame = ttk.Frame(results_notebook)
-        results_notebook.add(tab_frame, text="Error")
-        
-        tree = create_scrollable_tree(tab_frame, ("Error",))
-        tree.heading("Error", text="SQL Error")
-        tree.column("Error", anchor="w", width=900)
-        
-        tree.insert("", "end", values=(str(e),))
-        autosize_treeview_columns(tree)
-        
-        results_notebook.select(tab_frame)  # Select the error tab
-    
-    finally:
-        is_running_query = False
+        results_notebook.add(tab_frame, text=f"Result {run_state['result_count']}")
+        run_state["tabs"].append(tab_frame)
+
+        tree = create_virtual_grid(tab_frame, cols, [type_code for _, type_code in columns])
+        for col in cols:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=120)
+
+    run_state["tree"] = tree
+    run_state["tree_rows"] = 0
+    if run_state["pager"]:
+        run_state["pager"].bind_columns(cols)
+
+    # Show the first result as soon as it exists
+    if run_state["result_count"] == 1:
+        results_notebook.select(tab_frame)
+
+def append_result_rows(rows, arrow=False):
+    """Add a batch of rows (or an Arrow record batch) to the current result grid's backing store"""
+    tree = run_state["tree"]
+    if run_state["pager"]:
+        rows = run_state["pager"].record_rows(rows)
+    first_new = len(tree.store)
+    with run_state["timer"].measure("convert"):
+        if arrow:
+            tree.store.append_arrow(rows)
+        else:
+            tree.store.append_rows(rows)
+    with run_state["timer"].measure("render"):
+        tree.show_appended(first_new)
+    i = len(tree.store)
+    run_state["tree_rows"] = i
+    status_rows_label.config(text=f"Rows: {run_state['row_count'] + i:,} (fetching…)", fg="#ecf4f4")
+
+def finish_result_tab(row_total):
+    """Close off the current SELECT result set"""
+    tree = run_state["tree"]
+    run_state["result_infos"].append(f"{row_total} rows")
+    run_state["row_count"] += row_total
+
+    run_state["stores"].append(tree.store)
+    if tree.store.spill is not None:
+        run_state["result_infos"][-1] += f" ({len(tree.store.spill):,} spilled to disk)"
+
+    pager = run_state["pager"]
+    if pager:
+        # First page is in; later pages load as the grid scrolls near the end
+        pager.end_page()
+        run_state["result_infos"][-1] += " (paged)"
+        tree.on_near_end = lambda: load_next_page(tree, pager)
+        start_page_count(tree, pager)
+
+    if row_total:
+        with run_state["timer"].measure("autosize"):
+            autosize_treeview_columns(tree)
+    else:
+        tree.show_placeholder("(No rows returned)")
+    run_state["tree"] = None
+    run_state["tree_rows"] = 0
+
+def load_next_page(tree, pager):
+    """Fetch the next page of a paged result on a worker and append it to the grid"""
+    if pager.loading or pager.exhausted or is_running_query:
+        return
+    worker = QueryWorker(conn_str, *pager.next_page()).start()
+    root.after(POLL_INTERVAL_MS, lambda: poll_page_worker(worker, tree, pager))
+
+def poll_page_worker(worker, tree, pager):
+    if not tree.winfo_exists():
+        worker.cancel()  # Tab was closed
+        return
+    def stop_paging(error):
+        pager.loading = False
+        pager.exhausted = True
+        status_exec_label.config(text=f"Paging stopped: {str(error)[:80]}")
+
+    handlers = {
+        "rows": lambda rows: tree.append_rows(pager.record_rows(rows)),
+        "end_result": lambda _: pager.end_page(),
+        "error": stop_paging,
+    }
+    for event in worker.poll():
+        if dispatch(event, handlers):
+            update_paged_row_label(pager)
+            return
+    update_paged_row_label(pager)
+    root.after(POLL_INTERVAL_MS, lambda: poll_page_worker(worker, tree, pager))
+
+def start_page_count(tree, pager):
+    """Count the full result in the background so the status bar can show 'N of total'"""
+    sql = pager.count_sql()
+    if sql is None:
+        return
+    worker = QueryWorker(conn_str, sql).start()
+
+    def poll():
+        if not tree.winfo_exists():
+            return
+        for kind, payload in worker.poll():
+            if kind == "rows" and payload:
+                pager.total = payload[0][0]
+                update_paged_row_label(pager)
+            elif kind in ("done", "error", "cancelled"):
+                return
+        root.after(200, poll)
+
+    root.after(200, poll)
+
+def update_paged_row_label(pager):
+    of_total = f" of {pager.total:,}" if pager.total is not None else ""
+    status_rows_label.config(text=f"Rows: {pager.loaded:,}{of_total} (paged)", fg="green")
+
+def start_batch_progress(total):
+    """Add the Batches tab that tracks a GO-separated script batch by batch"""
+    tab_frame = ttk.Frame(results_notebook)
+    results_notebook.add(tab_frame, text=f"Batches ({total})")
+    run_state["tabs"].append(tab_frame)
+
+    tree = create_scrollable_tree(tab_frame, ("Batch", "Status", "Elapsed", "Rows", "Statement"))
+    for col, width, anchor in (("Batch", 80, "center"), ("Status", 220, "w"), ("Elapsed", 90, "e"),
+                               ("Rows", 90, "e"), ("Statement", 600, "w")):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, anchor=anchor)
+    tree.tag_configure("running", foreground="#2c3e50")
+    tree.tag_configure("ok", foreground="green")
+    tree.tag_configure("failed", foreground="red")
+
+    run_state["batch_tree"] = tree
+    results_notebook.select(tab_frame)
+
+def show_batch_started(index, total, sql):
+    tree = run_state["batch_tree"]
+    preview = " ".join(sql.split())[:120]
+    run_state["batch_items"][index] = tree.insert(
+        "", "end", values=(f"{index}/{total}", "running…", "", "", preview), tags=("running",))
+    tree.see(run_state["batch_items"][index])
+
+def show_batch_finished(info):
+    # A batch that failed mid-fetch leaves its result set open
+    if run_state["tree"] is not None:
+        finish_result_tab(len(run_state["tree"].store))
+
+    tree = run_state["batch_tree"]
+    item = run_state["batch_items"][info["index"]]
+    if info["error"]:
+        run_state["batch_errors"] += 1
+        status, tag = f"error: {info['error'][:200]}", "failed"
+    else:
+        status, tag = "ok", "ok"
+    tree.set(item, "Status", status)
+    tree.set(item, "Elapsed", f"{info['elapsed']:.3f}s")
+    tree.set(item, "Rows", f"{info['rows']:,}")
+    tree.item(item, tags=(tag,))
+
+def add_rowcount_tab(rowcount):
+    """Render the outcome of a non-SELECT statement"""
+    run_state["result_count"] += 1
+    affected = rowcount if rowcount >= 0 else "unknown"
+    run_state["result_infos"].append(f"{affected} row(s) affected")
+    if affected != "unknown":
+        run_state["row_count"] += affected
+
+    tab_frame = ttk.Frame(results_notebook)
+    results_notebook.add(tab_frame, text=f"Query {run_state['result_count']}")
+    run_state["tabs"].append(tab_frame)
+
+    tree = create_scrollable_tree(tab_frame, ("Message",))
+    tree.heading("Message", text="Execution Result")
+    tree.column("Message", anchor="w", width=600)
+
+    tree.insert(
+        "",
+        "end",
+        values=(f"Success: {affected} row(s) affected",)
+    )
+    autosize_treeview_columns(tree)
+
+def end_query_run():
+    global is_running_query, current_worker
+    is_running_query = False
+    current_worker = None
+    cancel_button.config(state=tk.DISABLED)
+
+def update_result_cache(completed):
+    """Store a finished read-only run; any other batch invalidates the database's entries"""
+    query = run_state["query"]
+    if not result_cache.is_read_only(query):
+        result_cache.invalidate_database(current_db)
+    elif completed and cache_results_var.get() and not run_state["pager"] and not run_state["stats"]:
+        result_cache.put(query, current_db, run_state["stores"], run_state["params"])
+
+def remember_run_stores(stores):
+    """Keep the results of a finished run, and of the one before, for Compare with Previous"""
+    global last_run_stores, previous_run_stores
+    previous_run_stores = last_run_stores
+    last_run_stores = list(stores)
+
+def ask_diff_key(columns):
+    """Modal picker for the key column; returns a column name, None (whole row) or False (cancelled)"""
+    dialog = tk.Toplevel(root)
+    dialog.title("Compare with Previous Run")
+    dialog.resizable(False, False)
+    dialog.configure(padx=20, pady=15)
+    dialog.transient(root)
+    dialog.grab_set()
+
+    whole_row = "(none - compare whole rows)"
+    tk.Label(dialog, text="Key column (rows with the same key are 'changed'):",
+             font=("Arial", 10)).pack(anchor="w")
+    key_var = tk.StringVar(value=whole_row)
+    ttk.Combobox(dialog, textvariable=key_var, values=[whole_row] + list(columns),
+                 state="readonly", width=40).pack(pady=(8, 12))
+
+    result = {"key": False}
+
+    def on_ok():
+        result["key"] = None if key_var.get() == whole_row else key_var.get()
+        dialog.destroy()
+
+    btn_frame = tk.Frame(dialog)
+    btn_frame.pack()
+    tk.Button(btn_frame, text="Compare", command=on_ok, width=12, bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=8)
+    tk.Button(btn_frame, text="Cancel", command=dialog.destroy, width=12).pack(side=tk.LEFT, padx=8)
+    dialog.bind("<Return>", lambda e: on_ok())
+    dialog.bind("<Escape>", lambda e: dialog.destroy())
+    dialog.wait_window()
+    return result["key"]
+
+def compare_with_previous_run():
+    """Diff the selected result tab against the same result set of the previous run"""
+    store = getattr(get_current_treeview(), "store", None)
+    index = next((i for i, s in enumerate(last_run_stores) if s is store), None)
+    if index is None:
+        messagebox.showwarning("Compare", "Select a result tab of the latest run.")
+        return
+    if index >= len(previous_run_stores):
+        messagebox.showwarning("Compare", "The previous run has no result set to compare with.")
+        return
+    old = previous_run_stores[index]
+
+    key = ask_diff_key([c for c in store.columns if c in old.columns])
+    if key is False:
+        return
+    start_time = time.time()
+    diff = diff_stores(old, store, key)
+    add_diff_tab(results_notebook, diff, f"Diff {index + 1}")
+    status_exec_label.config(text=f"Compared {len(old):,} vs {len(store):,} rows in {time.time() - start_time:.3f}s")
+
+def finish_query_run():
+    """Worker finished successfully: record history and update the status bar"""
+    end_query_run()
+    update_result_cache(completed=True)
+    remember_run_stores(run_state["stores"])
+    if not result_cache.is_read_only(run_state["query"]):
+        schema_catalog.load_async(conn_str)  # DDL may have changed it; only changed objects are re-read
+    result_infos = run_state["result_infos"]
+
+    if not run_state["result_count"]:
+        tab_frame = ttk.Frame(results_notebook)
+        results_notebook.add(tab_frame, text="Result")
+
+        tree = create_scrollable_tree(tab_frame, ("Message",))
+        tree.heading("Message", text="Info")
+        tree.column("Message", anchor="w", width=600)
+        tree.insert("", "end", values=("Query executed successfully.",))
+
+        result_infos.append("executed successfully")
+
+    if run_state["stats"]:
+        # Plan + STATISTICS output go to their own tab; result tabs stay as they are
+        add_plan_tab(results_notebook, run_state["plans"], run_state["messages"])
+
+    # Add to history (join infos if multiple results)
+    result_info = "; ".join(result_infos) if result_infos else "executed"
+    execution_time = time.time() - run_state["start_time"]
+    timings = run_state["timer"].as_dict()
+    failed = run_state["batch_errors"]
+    if failed:
+        # "Continue on error" let the script finish, but it didn't fully succeed
+        result_info = f"{failed} batch(es) failed; {result_info}"
+        add_history_entry(run_state["query"], "error", result_info[:100], timings)
+        refresh_history_list()
+        update_status_bar(f"Executed in {execution_time:.3f}s, {failed} batch(es) failed",
+                          run_state["row_count"], "success", timings, execution_time)
+        return
+
+    add_history_entry(run_state["query"], "success", result_info, timings)
+    refresh_history_list()
+    update_status_bar(f"Executed in {execution_time:.3f}s", run_state["row_count"], "success",
+                      timings, execution_time)
+    if run_state["pager"]:
+        update_paged_row_label(run_state["pager"])
+
+    # Select first result tab (index 0, since History is at the end)
+    if results_notebook.index("end") > 1:  # More than just History
+        results_notebook.select(1)
+
+def finish_cancelled_run():
+    """Worker stopped after a cancel: drop partial results and record the cancel"""
+    end_query_run()
+    update_result_cache(completed=False)
+    execution_time = run_state["cancel_time"] - run_state["start_time"]
+
+    for tab_frame in run_state["tabs"]:
+        close_result_tab(tab_frame)
+
+    add_history_entry(run_state["query"], "cancelled", f"cancelled after {execution_time:.3f}s")
+    refresh_history_list()
+    update_status_bar(f"Cancelled after {execution_time:.3f}s", 0, "cancelled")
+
+def fail_query_run(e):
+    """Worker raised: record the error and show it in its own tab"""
+    end_query_run()
+    update_result_cache(completed=False)
+    execution_time = time.time() - run_state["start_time"]
+    timings = run_state["timer"].as_dict()
+    add_history_entry(run_state["query"], "error", str(e)[:100], timings)
+    refresh_history_list()
+    update_status_bar(f"Error in {execution_time:.3f}s", 0, "error", timings, execution_time)
+
+    tab_frame = ttk.Frame(results_notebook)
+    tab_frame.error_message = str(e)  # Read by the AI assistant
+    results_notebook.add(tab_frame, text="Error")
+
+    tree = create_scrollable_tree(tab_frame, ("Error",))
+    tree.heading("Error", text="SQL Error")
+    tree.column("Error", anchor="w", width=900)
+
+    tree.insert("", "end", values=(str(e),))
+    autosize_treeview_columns(tree, max_width=None)
+
+    results_notebook.select(tab_frame)  # Select the error tab
 
 def format_sql_keywords(sql):
     """Return SQL with common SQL keywords uppercased, preserving literals/comments."""
@@ -364,20 +772,47 @@ def on_key_release(event):
         query_text.insert("1.0", formatted_query)
         highlight_sql()
 
-def update_status_bar(execution_msg, row_count, status):
-    """Update the status bar with execution info"""
+def update_status_bar(execution_msg, row_count, status, timings=None, total=None):
+    """Update the status bar with execution info; `timings` feeds the hover breakdown"""
+    global status_timings
     # Update execution time
-    status_exec_label.config(text=execution_msg)
+    status_timings = (timings, total) if timings else None
+    status_exec_label.config(text=execution_msg + ("  ⓘ" if timings else ""),
+                             cursor="question_arrow" if timings else "")
     
     # Update row count
     if status == "success":
         status_rows_label.config(text=f"Rows: {row_count}", fg="green")
+    elif status == "cancelled":
+        status_rows_label.config(text="Cancelled", fg="orange")
     else:
         status_rows_label.config(text="Error", fg="red")
     
     # Update database name (in case it changed)
     status_db_label.config(text=f"DB: {current_db}")
 
+def show_timings_tip(event=None):
+    """Hover panel under the execution time with the per-phase breakdown of the last run"""
+    global timings_tip
+    hide_timings_tip()
+    if not status_timings or is_running_query:
+        return
+    timings, total = status_timings
+    timings_tip = tk.Toplevel(root)
+    timings_tip.wm_overrideredirect(True)
+    tk.Label(timings_tip, text=format_timings(timings, total), justify=tk.LEFT, font=("Consolas", 9),
+             bg="#34495e", fg="white", padx=8, pady=6).pack()
+    timings_tip.update_idletasks()
+    x = status_exec_label.winfo_rootx()
+    y = status_exec_label.winfo_rooty() - timings_tip.winfo_reqheight() - 4
+    timings_tip.wm_geometry(f"+{x}+{y}")
+
+def hide_timings_tip(event=None):
+    global timings_tip
+    if timings_tip is not None:
+        timings_tip.destroy()
+        timings_tip = None
+
 def get_current_treeview():
     """Return the Treeview widget from the currently selected tab, or None."""
     current_tab = results_notebook.select()
@@ -418,7 +853,10 @@ def refresh_history_list():
         query_preview = query_preview.replace('\n', ' ')  # Remove newlines
         
         # Color code by result type
-        tags = ('success',) if entry['result_type'] == 'success' else ('error',)
+        if entry['result_type'] in ('success', 'cancelled'):
+            tags = (entry['result_type'],)
+        else:
+            tags = ('error',)
         
         history_tree.insert("", "end", values=(
             entry['timestamp'],
@@ -562,12 +1000,17 @@ def on_snippet_key_nav(event):
     snippet_listbox.after(1, load_current_snippet_from_listbox)
 
 
+def close_result_tab(tab_id):
+    """Remove a result tab and destroy its widgets (frees its rows, unless kept for Compare)"""
+    results_notebook.forget(tab_id)
+    results_notebook.nametowidget(tab_id).destroy()
+
 def clear_all():
     query_text.delete("1.0", tk.END)
     for tab in results_notebook.tabs():
         tab_name = results_notebook.tab(tab, "text")
         if tab_name != "History":
-            results_notebook.forget(tab)
+            close_result_tab(tab)
 
     # Add empty placeholder tab
     empty_tab = ttk.Frame(results_notebook)
@@ -586,16 +1029,8 @@ def copy_treeview_to_clipboard(tree):
         messagebox.showwarning("No Data", "Nothing to copy.")
         return
 
-    # Header row
-    lines = ["\t".join(columns)]
-
-    # Data rows
-    for child in tree.get_children():
-        values = tree.item(child)["values"]
-        values = ["" if v is None else str(v) for v in values]
-        lines.append("\t".join(values))
-
-    text = "\n".join(lines)
+    # Header row + data rows, tab separated
+    text = tree_clipboard_text(tree)
 
     # Copy to clipboard
     root.clipboard_clear()
@@ -732,23 +1167,129 @@ def highlight_sql(event=None):
         end = query_text.index(f"1.0 + {match.end()} chars")
         query_text.tag_add("comment", start, end)
 
+    refresh_parameter_panel()
+
+def refresh_parameter_panel():
+    """One entry per @name placeholder in the editor; the panel hides when there are none"""
+    global param_names
+    names = find_parameters(query_text.get("1.0", "end-1c"))
+    if names == param_names:
+        return
+    param_names = names
+    for child in param_frame.winfo_children():
+        child.destroy()
+    if not names:
+        param_frame.grid_remove()
+        return
+
+    tk.Label(param_frame, text="Parameters:", bg="lightblue", font=("Arial", 9, "bold")).pack(side=tk.LEFT, padx=(2, 6))
+    for name in names:
+        var = param_vars.setdefault(name.lower(), tk.StringVar())
+        tk.Label(param_frame, text=f"@{name}", bg="lightblue", font=("Consolas", 10)).pack(side=tk.LEFT)
+        tk.Entry(param_frame, textvariable=var, width=14, font=("Consolas", 10)).pack(side=tk.LEFT, padx=(2, 10))
+    tk.Label(param_frame, text="(empty = NULL, 'quotes' = text)", bg="lightblue", fg="#555555",
+             font=("Arial", 8)).pack(side=tk.LEFT)
+    param_frame.grid()
+
 def schedule_highlight(event=None):
     query_text.after_cancel("highlight")
     query_text.after(200, highlight_sql)
 
+def start_database_discovery():
+    """List the server's databases on a background thread; the connection it opens stays in the pool"""
+    def discover():
+        global known_databases
+        # Any SQL Server database can list sys.databases; from a local file, ask master
+        server_conn_str = conn_str if backend_for(conn_str).name == "mssql" else get_conn_str("master")
+        try:
+            known_databases = discover_databases(server_conn_str)
+        except Exception:
+            pass  # No server (or no rights): the picker offers local files and free text
+    threading.Thread(target=discover, daemon=True).start()
+
+def ask_database():
+    """Database picker: server databases + local files, filtered as you type. Returns a name or None"""
+    choices = known_databases + [name for name in local_database_files() if name not in known_databases]
+
+    dialog = tk.Toplevel(root)
+    dialog.title("Change Database")
+    dialog.resizable(False, False)
+    dialog.configure(padx=20, pady=15)
+    dialog.transient(root)
+    dialog.grab_set()
+
+    hint = "Pick a database or type a name (or a .sqlite / .duckdb file):"
+    if not known_databases:
+        hint += "\n(the server's database list isn't available yet)"
+    tk.Label(dialog, text=hint, font=("Arial", 10), justify="left").pack(anchor="w")
+    db_var = tk.StringVar(value=current_db)
+    combo = ttk.Combobox(dialog, textvariable=db_var, values=choices, width=40)
+    combo.pack(pady=(8, 12))
+    combo.focus_set()
+    combo.select_range(0, tk.END)
+
+    def filter_choices(event):
+        if event.keysym in ("Up", "Down", "Return", "Escape"):
+            return
+        typed = db_var.get().lower()
+        combo["values"] = [name for name in choices if typed in name.lower()] or choices
+
+    result = {"name": None}
+
+    def on_ok():
+        name = db_var.get().strip()
+        if not name:
+            return
+        known = {db.lower() for db in known_databases}
+        if known and name.lower() not in known and not local_conn_str(name):
+            if not messagebox.askyesno("Unknown Database",
+                                       f"'{name}' is not in the server's database list.\nUse it anyway?",
+                                       parent=dialog):
+                return
+        result["name"] = name
+        dialog.destroy()
+
+    combo.bind("<KeyRelease>", filter_choices)
+    btn_frame = tk.Frame(dialog)
+    btn_frame.pack()
+    tk.Button(btn_frame, text="Connect", command=on_ok, width=12, bg="#4a90e2", fg="white").pack(side=tk.LEFT, padx=8)
+    tk.Button(btn_frame, text="Cancel", command=dialog.destroy, width=12).pack(side=tk.LEFT, padx=8)
+    dialog.bind("<Return>", lambda e: on_ok())
+    dialog.bind("<Escape>", lambda e: dialog.destroy())
+    dialog.wait_window()
+    return result["name"]
+
 def change_database():
     global conn_str, current_db, db_label  # Add db_label here
-    new_db = simpledialog.askstring("Change Database", "Enter database name:", initialvalue=current_db)
+    new_db = ask_database()
     if new_db and new_db.strip():
         current_db = new_db.strip()
+        pool.reset_pool(conn_str)  # Drop idle connections to the old database
         conn_str = get_conn_str(current_db)
+        pool.prewarm(conn_str)  # Connect now, so the first run doesn't wait for it
         root.title(f"SQL Training Tool - Database: {current_db}")
         
         # UPDATE THE LABEL
         db_label.config(text=f"Database: {current_db}")
+        status_db_label.config(text=f"DB: {current_db}")
         
         messagebox.showinfo("Database Changed", f"Now connected to: {current_db}")
         clear_all()  # Clear results
+        schema_catalog.load_async(conn_str)
+
+def poll_schema_status():
+    """Show the schema catalog state of the current database in the status bar"""
+    catalog = schema_catalog.get(conn_str)
+    if schema_catalog.is_loading(conn_str):
+        text = f"Schema: {len(catalog):,} objects (refreshing…)" if catalog else "Schema: loading…"
+    elif catalog is None:
+        text = "Schema: -"
+    elif catalog.error:
+        text = "Schema: unavailable"
+    else:
+        text = f"Schema: {len(catalog):,} objects"
+    status_schema_label.config(text=text)
+    root.after(SCHEMA_POLL_MS, poll_schema_status)
 
 # ------------------- Main GUI Setup -------------------
 
@@ -830,6 +1371,9 @@ query_text.bind("<MouseWheel>", lambda e: query_text.after(1, line_numbers.redra
 query_text.bind("<Button-1>", lambda e: query_text.after(10, line_numbers.redraw))
 query_text.bind("<ButtonRelease-1>", lambda e: query_text.after(1, line_numbers.redraw))
 
+# Completion popup (Ctrl+Space) from the background schema catalog of the current database
+completion_popup = CompletionPopup(query_text, lambda: schema_catalog.get(conn_str))
+
 # Poll for changes regularly (catches everything including scrollbar dragging)
 def poll_line_numbers():
     line_numbers.redraw()
@@ -850,6 +1394,22 @@ left_btn_frame = tk.Frame(btn_frame, bg="lightblue")
 left_btn_frame.grid(row=0, column=0, sticky="w")
 
 tk.Button(left_btn_frame, text="Run Query", command=run_current_query, bg="#c0f405", width=15, cursor="hand2").pack(side=tk.LEFT, padx=2)
+cancel_button = tk.Button(left_btn_frame, text="Cancel", command=cancel_current_query, bg="#e74c3c", fg="white",
+                          width=10, cursor="hand2", state=tk.DISABLED)
+cancel_button.pack(side=tk.LEFT, padx=2)
+run_mode_var = tk.StringVar(value="Normal")  # "Paged" browses a big SELECT page by page
+ttk.Combobox(left_btn_frame, textvariable=run_mode_var, values=list(RUN_MODES),
+             state="readonly", width=16).pack(side=tk.LEFT, padx=2)
+continue_on_error_var = tk.BooleanVar(value=False)  # Keep running later GO batches after a failure
+tk.Checkbutton(left_btn_frame, text="Continue on error", variable=continue_on_error_var, bg="lightblue",
+               activebackground="lightblue").pack(side=tk.LEFT, padx=2)
+cache_results_var = tk.BooleanVar(value=False)  # Opt-in: repeat SELECTs render from memory
+tk.Checkbutton(left_btn_frame, text="Cache results", variable=cache_results_var, bg="lightblue",
+               activebackground="lightblue").pack(side=tk.LEFT, padx=2)
+arrow_fetch_var = tk.BooleanVar(value=False)  # Fetch into Arrow record batches (needs pyarrow)
+tk.Checkbutton(left_btn_frame, text="Arrow fetch", variable=arrow_fetch_var, bg="lightblue",
+               activebackground="lightblue",
+               state=tk.NORMAL if arrow_fetch.available() else tk.DISABLED).pack(side=tk.LEFT, padx=2)
 tk.Button(left_btn_frame, text="Clear", bg="#9db1f3",command=clear_all, width=12, cursor="hand2").pack(side=tk.LEFT, padx=2)
 tk.Button(left_btn_frame, text="Save as Snippet", bg="#7391f3", command=save_new_snippet_gui, width=15, cursor="hand2").pack(side=tk.LEFT, padx=2)
 tk.Button(left_btn_frame, text="Play with AI", bg="#b0dc11", command=lambda: show_ai_options_window(query_text, results_notebook), width=15, cursor="hand2").pack(side=tk.LEFT, padx=2)
@@ -861,6 +1421,14 @@ right_btn_frame.grid(row=0, column=1, sticky="e")
 tk.Button(right_btn_frame, text="Copy Results", command=lambda: copy_treeview_to_clipboard(get_current_treeview()),
           width=14, bg="#bdc3c7", cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
 
+tk.Button(right_btn_frame, text="Compare with Previous", command=compare_with_previous_run,
+          width=20, bg="#f5b041", cursor="hand2").pack(side=tk.LEFT, padx=(0, 8))
+
+# Parameter panel: filled from the @name placeholders in the editor (hidden when there are none)
+param_frame = tk.Frame(top_frame, bg="lightblue")
+param_frame.grid(row=3, column=0, sticky="ew", pady=(0, 8))
+param_frame.grid_remove()
+
 tk.Button(right_btn_frame, text="Export Results", command=lambda: export_results(get_current_treeview()),
           width=15, bg="#2ecc71", fg="white", cursor="hand2").pack(side=tk.LEFT)
 
@@ -904,6 +1472,7 @@ history_tree.column("Result", width=150)
 # Color tags
 history_tree.tag_configure('success', foreground='green')
 history_tree.tag_configure('error', foreground='red')
+history_tree.tag_configure('cancelled', foreground='orange')
 
 history_scroll_y.config(command=history_tree.yview)
 history_scroll_x.config(command=history_tree.xview)
@@ -978,6 +1547,8 @@ status_bar.grid_propagate(False)
 status_exec_label = tk.Label(status_bar, text="Ready", bg="#2c3e50", fg="white", 
                              font=("Arial", 9), anchor="w", padx=10)
 status_exec_label.pack(side=tk.LEFT, fill="x")
+status_exec_label.bind("<Enter>", show_timings_tip)
+status_exec_label.bind("<Leave>", hide_timings_tip)
 
 # Separator
 tk.Label(status_bar, text="|", bg="#2c3e50", fg="#7f8c8d", font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
@@ -995,6 +1566,11 @@ status_db_label = tk.Label(status_bar, text=f"DB: {current_db}", bg="#2c3e50", f
                           font=("Arial", 9, "bold"), anchor="w")
 status_db_label.pack(side=tk.LEFT, padx=5)
 
+# Schema catalog (tables / columns loaded in the background)
+status_schema_label = tk.Label(status_bar, text="Schema: -", bg="#2c3e50", fg="#95a5a6",
+                               font=("Arial", 9), anchor="w")
+status_schema_label.pack(side=tk.LEFT, padx=5)
+
 
 tk.Label(status_bar, text="|", bg="#2c3e50", fg="#7f8c8d", font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
 # AI Model label
@@ -1022,9 +1598,15 @@ status_snippet_label = tk.Label(status_bar, text="No snippet saved", bg="#2c3e50
 status_snippet_label.pack(side=tk.LEFT, padx=5)
 
 # --- START ---
+set_memory_budget(load_config()["memory_budget_mb"] * 1024 * 1024)
 load_snippets()
 refresh_snippet_list()
 load_history()
 refresh_history_list()
+start_database_discovery()  # Also opens the first pooled connection to the current database
+schema_catalog.load_async(conn_str)
+poll_schema_status()
 root.bind("<Control-Return>", run_current_query)
-root.mainloop()
\ No newline at end of file
+root.bind("<Escape>", cancel_current_query)
+root.mainloop()
+pool.reset_pool()  # Close pooled connections on exit
\ No newline at end of file
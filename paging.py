@@ -0,0 +1,144 @@
+# paging.py
+"""
+Server-side paging for browsing huge SELECTs.
+Instead of pulling a whole result to the client, a single SELECT is run one
+page at a time: keyset paging (WHERE key >= last key) when it is ordered by
+a single output column, OFFSET ... FETCH NEXT otherwise.
+Keyset pages and the row count wrap the query in a derived table; a WITH
+clause is moved in front of the wrapper, and results whose columns can't
+be a derived table (unnamed or duplicate names) page by OFFSET, uncounted.
+"""
+
+import re
+
+from sql_text import is_code, is_read_only, is_single_statement, split_order_by, tokenize, words
+
+PAGE_SIZE = 1000  # Rows per page
+
+
+def can_page(sql):
+    """Return None if `sql` can run in paged mode, else the reason it can't."""
+    if not is_read_only(sql) or not is_single_statement(sql):
+        return "Paged mode needs a single SELECT statement."
+    body, _ = split_order_by(sql)
+    if "offset" in words(sql) or re.search(r"^\s*(with\b.*\bselect|select)\s+(distinct\s+)?top\b", body, re.I | re.S):
+        return "Paged mode can't be combined with TOP or OFFSET in the query."
+    return None
+
+
+def _split_with(body):
+    """(WITH clause, main SELECT) of `body`; the clause is "" when there are no CTEs."""
+    tokens = tokenize(body)
+    code = [token.lower() for token in tokens if is_code(token)]
+    if not code or code[0].lstrip(";") != "with":
+        return "", body
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.lower() == "select":
+            return "".join(tokens[:i]), "".join(tokens[i:])
+    return "", body
+
+
+def _keyset_key(order_by):
+    """(column, descending) if ORDER BY is a single plain column, else None."""
+    if not order_by:
+        return None
+    match = re.fullmatch(r"ORDER\s+BY\s+((?:\w+|\[[^\]]+\])(?:\.(?:\w+|\[[^\]]+\]))*)(?:\s+(ASC|DESC))?",
+                         order_by, re.I)
+    if not match:
+        return None
+    column = match.group(1).split(".")[-1].strip("[]")
+    return column, (match.group(2) or "").upper() == "DESC"
+
+
+class PagedQuery:
+    """
+    Page state of one SELECT.
+    `next_page()` returns (sql, params) for the next page; feed the rows it
+    returns back through `record_rows()` and `end_page()`.
+    """
+
+    def __init__(self, sql, page_size=PAGE_SIZE):
+        self.sql = sql
+        self.page_size = page_size
+        self.body, self.order_by = split_order_by(sql)
+        self.with_clause, self.select = _split_with(self.body)
+        self.wrappable = True  # Output columns are usable as a derived table (named and unique)
+        self.key = _keyset_key(self.order_by)
+        self.key_index = None  # Position of the key column in the output
+        self.loaded = 0  # Rows fetched so far
+        self.page_rows = 0  # Rows fetched for the page in flight
+        self.last_key = None
+        self.ties = 0  # Rows at the end of the loaded data sharing last_key
+        self.skip = 0  # Rows to drop from the start of the page in flight
+        self.requested = 0  # Rows asked for by the page in flight
+        self.exhausted = False
+        self.loading = False
+        self.total = None  # Full row count, filled in by a background COUNT_BIG
+
+    def bind_columns(self, columns):
+        """Locate the keyset column in the output; falls back to OFFSET paging if absent."""
+        names = [c.lower() for c in columns]
+        self.wrappable = all(names) and len(set(names)) == len(names)
+        if self.key and self.wrappable and self.key[0].lower() in names:
+            self.key_index = names.index(self.key[0].lower())
+
+    def next_page(self):
+        self.loading = True
+        self.page_rows = 0
+        self.skip = 0
+        self.requested = self.page_size
+        order_by = self.order_by or "ORDER BY (SELECT NULL)"
+
+        if self.loaded == 0 or self.key_index is None or self.last_key is None:
+            # First page, no usable key, or the page ended inside the NULL keys
+            return (f"{self.body}\n{order_by}\n"
+                    f"OFFSET {self.loaded} ROWS FETCH NEXT {self.page_size} ROWS ONLY"), None
+
+        # Keyset: restart at the last key and drop the rows already seen with it,
+        # so a non-unique key can't skip or repeat rows. NULLs sort lowest, so
+        # descending pages end with them and must keep them in range.
+        column, descending = self.key
+        if descending:
+            where, direction = f"([{column}] <= ? OR [{column}] IS NULL)", "DESC"
+        else:
+            where, direction = f"[{column}] >= ?", "ASC"
+        self.skip = self.ties
+        self.requested = self.page_size + self.ties
+        sql = (f"{self.with_clause}SELECT TOP ({self.page_size + self.ties}) * FROM (\n{self.select}\n) AS _page\n"
+               f"WHERE {where}\nORDER BY [{column}] {direction}")
+        return sql, [self.last_key]
+
+    def record_rows(self, rows):
+        """Account for a batch of the page in flight; returns the rows that are new."""
+        self.page_rows += len(rows)
+        if self.skip:
+            dropped = min(self.skip, len(rows))
+            rows = rows[dropped:]
+            self.skip -= dropped
+
+        if self.key_index is not None:
+            for row in rows:
+                value = row[self.key_index]
+                if value is not None and value == self.last_key:
+                    self.ties += 1
+                else:
+                    self.last_key = value
+                    self.ties = 1
+        self.loaded += len(rows)
+        return rows
+
+    def end_page(self):
+        self.loading = False
+        if self.page_rows < self.requested:
+            self.exhausted = True
+
+    def count_sql(self):
+        """Query for the total row count, run in the background (None if it can't be wrapped)."""
+        if not self.wrappable:
+            return None
+        return f"{self.with_clause}SELECT COUNT_BIG(*) FROM (\n{self.select}\n) AS _count"
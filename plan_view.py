@@ -0,0 +1,137 @@
+# plan_view.py
+"""
+Execution plan + STATISTICS IO/TIME display.
+Parses SQL Server showplan XML into a tree of operators and renders it,
+together with the server's info messages, in a "Plan" result tab.
+"""
+
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import xml.etree.ElementTree as ET
+
+SHOWPLAN_NS = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _child_relops(elem):
+    """RelOp elements directly below `elem` (they sit inside operator-specific wrappers)."""
+    for child in elem:
+        if child.tag == SHOWPLAN_NS + "RelOp":
+            yield child
+        elif child.tag != SHOWPLAN_NS + "RunTimeInformation":
+            yield from _child_relops(child)
+
+
+def _parse_relop(relop):
+    actual = None
+    runtime = relop.find(SHOWPLAN_NS + "RunTimeInformation")
+    if runtime is not None:
+        # Parallel plans report one counter per thread
+        actual = sum(int(c.get("ActualRows", 0))
+                     for c in runtime.findall(SHOWPLAN_NS + "RunTimeCountersPerThread"))
+    return {
+        "op": relop.get("PhysicalOp", "?"),
+        "logical": relop.get("LogicalOp", ""),
+        "est_rows": _float(relop.get("EstimateRows")),
+        "actual_rows": actual,
+        "subtree_cost": _float(relop.get("EstimatedTotalSubtreeCost")) or 0.0,
+        "children": [_parse_relop(child) for child in _child_relops(relop)],
+    }
+
+
+def parse_showplan(xml_text):
+    """
+    Return one dict per statement in the plan:
+      {"text", "cost", "root"} where root is an operator node
+      {"op", "logical", "est_rows", "actual_rows", "subtree_cost", "children"}.
+    """
+    statements = []
+    root = ET.fromstring(xml_text)
+    for stmt in root.iter(SHOWPLAN_NS + "StmtSimple"):
+        query_plan = stmt.find(SHOWPLAN_NS + "QueryPlan")
+        relop = query_plan.find(SHOWPLAN_NS + "RelOp") if query_plan is not None else None
+        if relop is None:
+            continue
+        statements.append({
+            "text": " ".join((stmt.get("StatementText") or "").split()),
+            "cost": _float(stmt.get("StatementSubTreeCost")) or 0.0,
+            "root": _parse_relop(relop),
+        })
+    return statements
+
+
+def _fmt_rows(value):
+    if value is None:
+        return ""
+    return f"{value:,.0f}" if value >= 1 else f"{value:.2f}"
+
+
+def _insert_node(tree, parent, node, total_cost):
+    own_cost = node["subtree_cost"] - sum(c["subtree_cost"] for c in node["children"])
+    share = f"{own_cost / total_cost:.0%}" if total_cost else ""
+    label = node["op"] if node["logical"] in ("", node["op"]) else f"{node['op']} ({node['logical']})"
+    item = tree.insert(parent, "end", text=label, open=True, values=(
+        _fmt_rows(node["est_rows"]),
+        _fmt_rows(node["actual_rows"]),
+        f"{node['subtree_cost']:.4f}",
+        share,
+    ))
+    for child in node["children"]:
+        _insert_node(tree, item, child, total_cost)
+
+
+def add_plan_tab(results_notebook, plan_xmls, messages):
+    """Add a "Plan" tab with the operator tree(s) and the STATISTICS messages."""
+    tab_frame = ttk.Frame(results_notebook)
+    results_notebook.add(tab_frame, text="Plan")
+
+    pane = ttk.PanedWindow(tab_frame, orient=tk.VERTICAL)
+    pane.pack(fill="both", expand=True)
+
+    tree_frame = ttk.Frame(pane)
+    pane.add(tree_frame, weight=3)
+
+    columns = ("Est. rows", "Actual rows", "Subtree cost", "Cost %")
+    tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings")
+    tree.heading("#0", text="Operator")
+    tree.column("#0", width=360)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=110, anchor="e")
+
+    y_scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=y_scroll.set)
+    tree.grid(row=0, column=0, sticky="nsew")
+    y_scroll.grid(row=0, column=1, sticky="ns")
+    tree_frame.grid_rowconfigure(0, weight=1)
+    tree_frame.grid_columnconfigure(0, weight=1)
+
+    for xml_text in plan_xmls:
+        try:
+            statements = parse_showplan(xml_text)
+        except ET.ParseError as e:
+            tree.insert("", "end", text=f"Could not parse plan: {e}")
+            continue
+        for stmt in statements:
+            stmt_item = tree.insert("", "end", text=stmt["text"][:120], open=True,
+                                    values=("", "", f"{stmt['cost']:.4f}", ""))
+            _insert_node(tree, stmt_item, stmt["root"], stmt["cost"])
+
+    if not plan_xmls:
+        tree.insert("", "end", text="(No plan captured - use 'With stats + plan')")
+
+    # STATISTICS IO / TIME output
+    messages_frame = ttk.Frame(pane)
+    pane.add(messages_frame, weight=1)
+    messages_text = scrolledtext.ScrolledText(messages_frame, height=8, font=("Consolas", 10), wrap=tk.NONE)
+    messages_text.pack(fill="both", expand=True)
+    messages_text.insert("1.0", "\n".join(messages) if messages else "(No messages)")
+    messages_text.config(state="disabled")
+
+    return tab_frame
@@ -0,0 +1,177 @@
+# pool.py
+"""
+Small pool of reusable database connections, keyed by connection string.
+Opening a connection (TLS + SSPI handshake) is often slower than the query
+itself, so finished connections are parked here and handed out again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import backends
+
+IDLE_TIMEOUT = 300  # Seconds an unused connection stays open
+MAX_IDLE_PER_KEY = 4  # Idle connections kept per connection string
+PING_SQL = "SELECT 1"
+MAX_PREPARED_PER_CONN = 16  # Prepared cursors kept per connection (least recently used dropped)
+
+_idle = {}  # conn_str -> list of (connection, last_used)
+_prepared = {}  # id(connection) -> OrderedDict of sql -> cursor that has it prepared
+_lock = threading.Lock()
+_reaper = None
+
+
+def _close_cursor(cursor):
+    try:
+        cursor.close()
+    except Exception:
+        pass
+
+
+def _close_quietly(conn):
+    with _lock:
+        cursors = _prepared.pop(id(conn), {})
+    for cursor in cursors.values():
+        _close_cursor(cursor)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def prepared_cursor(conn, sql):
+    """
+    Cursor of `conn` for the parameterized statement `sql`, reused across runs.
+    pyodbc prepares a statement once and keeps it while a cursor executes the
+    same SQL text, so a snippet run again with new values skips the prepare
+    round trip. The cursor belongs to the pool: don't close it.
+    """
+    with _lock:
+        cursors = _prepared.setdefault(id(conn), OrderedDict())
+        cursor = cursors.pop(sql, None)
+        evicted = None
+        if cursor is None and len(cursors) >= MAX_PREPARED_PER_CONN:
+            evicted = cursors.popitem(last=False)[1]
+    if evicted is not None:
+        _close_cursor(evicted)
+    if cursor is None:
+        cursor = conn.cursor()
+    with _lock:
+        _prepared.setdefault(id(conn), OrderedDict())[sql] = cursor
+    return cursor
+
+
+def _ping(conn):
+    """Health check: True if the connection still answers a trivial query."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(PING_SQL)
+        cursor.fetchone()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def checkout(conn_str):
+    """Return a healthy connection for `conn_str`, reusing an idle one when possible."""
+    while True:
+        with _lock:
+            entries = _idle.get(conn_str)
+            if not entries:
+                break
+            conn, last_used = entries.pop()
+
+        if time.time() - last_used > IDLE_TIMEOUT or not _ping(conn):
+            _close_quietly(conn)
+            continue
+        return conn
+
+    return backends.connect(conn_str)
+
+
+def _session_clean(conn_str, conn):
+    try:
+        return backends.backend_for(conn_str).session_clean(conn, conn_str)
+    except Exception:
+        return False
+
+
+def checkin(conn_str, conn):
+    """
+    Give a connection back to the pool after a successful run. A connection
+    the script left inside a transaction or switched to another database is
+    closed instead, so the next run under this key starts clean.
+    """
+    if not _session_clean(conn_str, conn):
+        _close_quietly(conn)
+        return
+    with _lock:
+        entries = _idle.setdefault(conn_str, [])
+        if len(entries) < MAX_IDLE_PER_KEY:
+            entries.append((conn, time.time()))
+            conn = None
+    if conn is not None:
+        _close_quietly(conn)
+    _ensure_reaper()
+
+
+def prewarm(conn_str):
+    """Open a connection for `conn_str` on a background thread and park it, so the first run skips the connect."""
+    def warm():
+        try:
+            conn = backends.connect(conn_str)
+        except Exception:
+            return  # The first run will report the problem
+        checkin(conn_str, conn)
+    threading.Thread(target=warm, daemon=True).start()
+
+
+def discard(conn):
+    """Close a connection that may be in a bad state (error, cancel) instead of pooling it."""
+    _close_quietly(conn)
+
+
+def close_idle(max_idle=IDLE_TIMEOUT):
+    """Close connections that have been idle longer than `max_idle` seconds."""
+    now = time.time()
+    expired = []
+    with _lock:
+        for conn_str, entries in _idle.items():
+            keep = []
+            for conn, last_used in entries:
+                if now - last_used > max_idle:
+                    expired.append(conn)
+                else:
+                    keep.append((conn, last_used))
+            _idle[conn_str] = keep
+    for conn in expired:
+        _close_quietly(conn)
+
+
+def reset_pool(conn_str=None):
+    """Close every idle connection for `conn_str` (or for all keys when None)."""
+    with _lock:
+        if conn_str is None:
+            entries = [e for key_entries in _idle.values() for e in key_entries]
+            _idle.clear()
+        else:
+            entries = _idle.pop(conn_str, [])
+    for conn, _ in entries:
+        _close_quietly(conn)
+
+
+def _reaper_loop():
+    while True:
+        time.sleep(IDLE_TIMEOUT / 5)
+        close_idle()
+
+
+def _ensure_reaper():
+    """Start the background thread that closes idle connections (once)."""
+    global _reaper
+    with _lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reaper_loop, daemon=True)
+            _reaper.start()
@@ -0,0 +1,153 @@
+# query_params.py
+"""
+Named query parameters.
+`@name` placeholders in a query or snippet are filled from the parameter
+panel and sent with cursor.execute(sql, params) as `?` markers instead of
+being pasted into the SQL text, so SQL Server reuses one plan for every
+value (and the pool can keep the statement prepared, see pool.prepared_cursor).
+Not placeholders: @@globals, variables the script DECLAREs itself, named
+EXEC arguments (`EXEC dbo.P @CustomerId = ...`) and the parameters of a
+CREATE / ALTER PROCEDURE or FUNCTION.
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sql_text import is_code, tokenize, words
+
+PARAM_RE = re.compile(r"@([A-Za-z_]\w*)")
+SCAN_RE = re.compile(r"@@?[\w#$]*|[A-Za-z_#][\w#$]*|\d[\w.]*|[^\s\w]")
+INT_RE = re.compile(r"[-+]?\d+")
+DECIMAL_RE = re.compile(r"[-+]?(\d+\.\d*|\.\d+)")
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+DATETIME_RE = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+
+# Statements that end a DECLARE / EXEC list when the script leaves out the ';'
+STATEMENT_WORDS = {
+    "select", "set", "insert", "update", "delete", "merge", "if", "while", "begin", "exec",
+    "execute", "with", "return", "print", "declare", "create", "alter", "drop", "truncate",
+}
+
+
+def _defines_routine(sql):
+    """True for CREATE / ALTER PROCEDURE / FUNCTION scripts (their @names are the routine's)."""
+    previous = None
+    for word in words(sql):
+        if previous in ("create", "alter") and word in ("procedure", "proc", "function"):
+            return True
+        previous = word
+    return False
+
+
+def _code_text(sql):
+    """`sql` with literals, quoted names and comments blanked out (same length, so offsets match)."""
+    return "".join(token if is_code(token) or token.isspace() else " " * len(token)
+                   for token in tokenize(sql))
+
+
+def _scan(sql):
+    """
+    (declared, placeholders) for `sql`: the lowercased names the script
+    DECLAREs, and (start, end, name) per `@name` sent as a parameter. Named EXEC
+    arguments (`EXEC dbo.P @CustomerId = @id`) are left alone: the name
+    before '=' belongs to the procedure, only the value can be a placeholder.
+    A DECLARE list or EXEC argument list ends at ';' or at the next
+    statement keyword outside parentheses.
+    """
+    declared = set()
+    placeholders = []
+    tokens = list(SCAN_RE.finditer(_code_text(sql)))
+    statement = None  # "declare" / "exec" while inside one
+    expect_name = False  # Right after DECLARE or a top-level ',' in its list
+    depth = 0
+    for i, match in enumerate(tokens):
+        token = match.group(0)
+        lowered = token.lower()
+        if token == ";" or (depth == 0 and lowered in STATEMENT_WORDS):
+            statement = lowered if lowered in ("declare", "exec", "execute") else None
+            expect_name = statement == "declare"
+            depth = 0
+            continue
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(0, depth - 1)
+        elif token == "," and depth == 0:
+            expect_name = statement == "declare"
+        elif token.startswith("@"):
+            param = PARAM_RE.fullmatch(token)
+            if statement == "declare" and expect_name:
+                if param:
+                    declared.add(param.group(1).lower())
+            elif param:
+                named_argument = (statement in ("exec", "execute") and depth == 0
+                                  and i + 1 < len(tokens) and tokens[i + 1].group(0) == "=")
+                if not named_argument:
+                    placeholders.append((match.start(), match.end(), param.group(1)))
+            expect_name = False
+        else:
+            expect_name = False
+    return declared, [found for found in placeholders if found[2].lower() not in declared]
+
+
+def find_parameters(sql):
+    """`@name` placeholders of `sql` in order of first use (names are case-insensitive, as in T-SQL)."""
+    if _defines_routine(sql):
+        return []
+    names = []
+    seen = set()
+    for _, _, name in _scan(sql)[1]:
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def bind_parameters(sql, values):
+    """
+    (sql with `?` markers, [values in marker order]) for the placeholders of
+    `sql`; `values` maps names (any case) to Python values, missing ones are NULL.
+    """
+    if _defines_routine(sql):
+        return sql, []
+    placeholders = _scan(sql)[1]
+    if not placeholders:
+        return sql, []
+    lookup = {name.lower(): value for name, value in values.items()}
+    parts = []
+    bound = []
+    position = 0
+    for start, end, name in placeholders:
+        parts.append(sql[position:start])
+        parts.append("?")
+        bound.append(lookup.get(name.lower()))
+        position = end
+    parts.append(sql[position:])
+    return "".join(parts), bound
+
+
+def parse_value(text):
+    """
+    Python value for a parameter typed in the panel, so the driver sends a
+    matching SQL type: 42 -> int, 1.5 -> Decimal, 2024-01-31 -> date,
+    2024-01-31 08:00 -> datetime, empty or NULL -> NULL, 'quoted' -> that
+    text as-is, anything else -> string.
+    """
+    text = text.strip()
+    if not text or text.upper() == "NULL":
+        return None
+    if len(text) >= 2 and text[0] == text[-1] == "'":
+        return text[1:-1].replace("''", "'")
+    try:
+        if INT_RE.fullmatch(text):
+            return int(text)
+        if DECIMAL_RE.fullmatch(text):
+            return Decimal(text)
+        if DATE_RE.fullmatch(text):
+            return date.fromisoformat(text)
+        if DATETIME_RE.fullmatch(text):
+            return datetime.fromisoformat(text)
+    except (ValueError, InvalidOperation):
+        pass
+    return text
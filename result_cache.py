@@ -0,0 +1,71 @@
+# result_cache.py
+"""
+Opt-in cache of query results, keyed by normalized SQL + database
+(+ the @parameter values of a parameterized run).
+Repeat runs of the same read-only query render straight from memory.
+Entries are evicted least-recently-used once the total size passes
+CACHE_MAX_BYTES, and every entry for a database is dropped as soon as a
+non-SELECT batch runs against it.
+"""
+
+import time
+from collections import OrderedDict
+
+from sql_text import normalize_sql, is_read_only
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_entries = OrderedDict()  # (normalized_sql, db, params) -> entry
+_total_bytes = 0
+
+
+def _key(sql, db, params):
+    values = tuple(sorted((name.lower(), repr(value)) for name, value in params.items())) if params else None
+    return (normalize_sql(sql), db, values)
+
+
+def get(sql, db, params=None):
+    """Cached entry for `sql` on `db`, or None. An entry has 'stores', 'created' and 'nbytes'."""
+    key = _key(sql, db, params)
+    entry = _entries.get(key)
+    if entry is not None:
+        _entries.move_to_end(key)
+    return entry
+
+
+def put(sql, db, stores, params=None):
+    """Cache the ResultStores produced by `sql` (with `params`) on `db`."""
+    global _total_bytes
+    key = _key(sql, db, params)
+    if any(store.spill is not None for store in stores):
+        return  # Spilled results live in temp files that go away with their tab
+    nbytes = sum(store.nbytes() for store in stores)
+    if nbytes > CACHE_MAX_BYTES:
+        return  # Would evict everything else and still not fit
+
+    _remove(key)
+    _entries[key] = {"stores": stores, "created": time.time(), "nbytes": nbytes}
+    _total_bytes += nbytes
+
+    while _total_bytes > CACHE_MAX_BYTES:
+        oldest = next(iter(_entries))
+        _remove(oldest)
+
+
+def _remove(key):
+    global _total_bytes
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _total_bytes -= entry["nbytes"]
+
+
+def invalidate_database(db):
+    """Drop every cached result for `db` (called after a non-SELECT batch)."""
+    for key in [k for k in _entries if k[1] == db]:
+        _remove(key)
+
+
+def clear():
+    global _total_bytes
+    _entries.clear()
+    _total_bytes = 0
@@ -0,0 +1,139 @@
+# result_diff.py
+"""
+"Compare with previous run": diff two result sets by hashing their rows.
+Without a key, rows are matched as a multiset (added / removed only).
+With a key column, rows sharing a key whose other values differ count as
+changed. One pass over each ResultStore, so a few hundred thousand rows
+take a second or two.
+"""
+
+from collections import deque
+from tkinter import ttk
+
+from database import autosize_treeview_columns, create_virtual_grid
+from result_store import ResultStore
+
+MAX_DIFF_ROWS = 500_000  # Rows listed in the Diff tab (counts are always exact)
+
+
+def _row_hash(row):
+    try:
+        return hash(row)
+    except TypeError:  # Unhashable driver value (e.g. bytearray)
+        return hash(repr(row))
+
+
+def _find_equal(rows, row):
+    """Index of an entry of `rows` equal to `row` (newest first), or -1."""
+    for i in range(len(rows) - 1, -1, -1):
+        if rows[i] == row:
+            return i
+    return -1
+
+
+def _rows(store, columns):
+    """Rows of `store` restricted to `columns`, in that order (one typed pass per column)."""
+    values = [store.column_values(store.columns.index(name)) for name in columns]
+    return zip(*values)
+
+
+def diff_stores(old, new, key=None):
+    """
+    Compare two ResultStores on the columns they share.
+    Returns {"columns", "key", "added", "removed", "changed", "unchanged",
+    "added_columns", "removed_columns"} where added / removed are lists of
+    rows and changed is a list of (old_row, new_row).
+    """
+    columns = [name for name in new.columns if name in old.columns]
+    result = {
+        "columns": columns,
+        "key": key,
+        "added": [],
+        "removed": [],
+        "changed": [],
+        "unchanged": 0,
+        "added_columns": [name for name in new.columns if name not in old.columns],
+        "removed_columns": [name for name in old.columns if name not in new.columns],
+    }
+
+    if key is None:
+        # Multiset of whole rows bucketed by hash: hash -> old rows with it.
+        # Equal hashes don't prove equal rows (hash(-1) == hash(-2)), so a
+        # match must also compare equal.
+        pending = {}
+        for row in _rows(old, columns):
+            pending.setdefault(_row_hash(row), []).append(row)
+        for row in _rows(new, columns):
+            matches = pending.get(_row_hash(row))
+            i = _find_equal(matches, row) if matches else -1
+            if i >= 0:
+                matches[i] = matches[-1]
+                matches.pop()
+                result["unchanged"] += 1
+            else:
+                result["added"].append(row)
+        result["removed"] = [row for rows in pending.values() for row in rows]
+        return result
+
+    k = columns.index(key)
+    pending = {}  # key value -> deque of old rows; keys may repeat
+    for row in _rows(old, columns):
+        pending.setdefault(row[k], deque()).append(row)
+    for row in _rows(new, columns):
+        matches = pending.get(row[k])
+        if not matches:
+            result["added"].append(row)
+            continue
+        old_row = matches.popleft()
+        if old_row == row:
+            result["unchanged"] += 1
+        else:
+            result["changed"].append((old_row, row))
+    result["removed"] = [row for rows in pending.values() for row in rows]
+    return result
+
+
+def summary(diff):
+    text = (f"Added: {len(diff['added']):,}   Removed: {len(diff['removed']):,}   "
+            f"Changed: {len(diff['changed']):,}   Unchanged: {diff['unchanged']:,}")
+    if diff["key"] is not None:
+        text += f"   (key: {diff['key']})"
+    if diff["added_columns"] or diff["removed_columns"]:
+        text += (f"\nCompared on shared columns only. New: {', '.join(diff['added_columns']) or '-'};"
+                 f" gone: {', '.join(diff['removed_columns']) or '-'}")
+    return text
+
+
+def add_diff_tab(results_notebook, diff, title="Diff"):
+    """Add a tab listing the differences, one row per added / removed row and two per changed row."""
+    tab_frame = ttk.Frame(results_notebook)
+    results_notebook.add(tab_frame, text=title)
+
+    ttk.Label(tab_frame, text=summary(diff), font=("Segoe UI", 9, "bold"),
+              padding=(8, 6)).pack(anchor="w")
+
+    columns = ["Change"] + diff["columns"]
+    store = ResultStore(columns)
+    listed = 0
+    for label, rows in (("added", diff["added"]), ("removed", diff["removed"])):
+        rows = rows[:MAX_DIFF_ROWS - listed]
+        store.append_rows([(label,) + tuple(row) for row in rows])
+        listed += len(rows)
+    changed = []
+    for old_row, new_row in diff["changed"][:max(0, (MAX_DIFF_ROWS - listed) // 2)]:
+        changed.append(("changed (old)",) + tuple(old_row))
+        changed.append(("changed (new)",) + tuple(new_row))
+    store.append_rows(changed)
+
+    tree = create_virtual_grid(tab_frame, columns, store=store)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, anchor="center", width=120)
+    if len(store):
+        tree.refresh()
+        autosize_treeview_columns(tree)
+    else:
+        tree.show_placeholder("(No differences)")
+
+    results_notebook.select(tab_frame)
+    return tab_frame
@@ -0,0 +1,255 @@
+# result_grid.py
+"""
+Virtualized result grid.
+A Treeview that only holds items for the rows currently on screen; all rows
+live in a ResultStore and scrolling just rewrites the visible items, so a
+million-row result scrolls as smoothly as a ten-row one.
+Header clicks sort and the quick filter narrows the rows client-side: the
+grid shows a view (a list of store row indices) over the fetched data, with
+no round trip to the server.
+"""
+
+from bisect import bisect_right
+from tkinter import ttk
+
+from result_store import ResultStore
+
+DEFAULT_ROW_HEIGHT = 25  # Matches style.configure("Treeview", rowheight=25) in main.py
+WHEEL_ROWS = 3  # Rows scrolled per mouse wheel notch
+NEAR_END_ROWS = 200  # on_near_end fires when the viewport gets this close to the last row
+SORT_ARROWS = {False: " \u25b2", True: " \u25bc"}  # Heading suffix: ascending / descending
+
+
+class VirtualGrid(ttk.Treeview):
+    """Treeview showing a scrolling window over `self.store` (the backing ResultStore)."""
+
+    def __init__(self, master, columns, types=None, store=None, **kwargs):
+        super().__init__(master, columns=columns, show="headings", **kwargs)
+        # Backing store: every row of the result set (an existing one is shown as-is)
+        self.store = store if store is not None else ResultStore(columns, types)
+        self.placeholder = None  # Text shown while the store is empty, e.g. "(No rows returned)"
+        self.on_near_end = None  # Callback when scrolling nears the last loaded row (paged mode)
+        self.top = 0  # Index of the first visible row
+        self.yscroll = None  # Vertical scrollbar .set, driven by us instead of the Treeview
+        self.view = None  # Store row indices in display order while sorted / filtered, else None
+        self.sort_column = None  # Index of the sorted column
+        self.sort_desc = False
+        self.filter_text = ""  # Casefolded quick-filter text
+        self.on_view_change = None  # Callback after the view was rebuilt or extended
+        self._sort_keys = {}  # column -> (store length, keys) - built once per column
+        self._search_text = {}  # column -> (store length, search text) - built on first filter
+
+        for c in range(len(self.store.columns)):
+            self.heading(f"#{c + 1}", command=lambda c=c: self.sort_by(c))
+
+        self.tag_configure("even", background="#f9f9f9")
+        self.tag_configure("odd", background="#ffffff")
+
+        self.bind("<Configure>", lambda e: self.refresh())
+        self.bind("<MouseWheel>", self._on_mousewheel)
+        self.bind("<Button-4>", lambda e: self._scroll_rows(-WHEEL_ROWS))
+        self.bind("<Button-5>", lambda e: self._scroll_rows(WHEEL_ROWS))
+        self.bind("<Up>", lambda e: self._scroll_rows(-1))
+        self.bind("<Down>", lambda e: self._scroll_rows(1))
+        self.bind("<Prior>", lambda e: self._scroll_rows(-self.visible_count()))
+        self.bind("<Next>", lambda e: self._scroll_rows(self.visible_count()))
+        self.bind("<Home>", lambda e: self._scroll_to(0))
+        self.bind("<End>", lambda e: self._scroll_to(self.row_count()))
+
+    # ---------------- Backing store ----------------
+
+    def append_rows(self, rows):
+        """Add rows to the backing store; only redraws if they land on screen."""
+        first_new = len(self.store)
+        self.store.append_rows(rows)
+        self.show_appended(first_new)
+
+    def show_appended(self, first_new):
+        """Update the view after rows from store index `first_new` on were added to the store."""
+        if self.view is not None:
+            # Sorted / filtered while still fetching: new rows go to the end until the next sort
+            self._extend_view(first_new)
+            first_new = len(self.view)
+        if first_new < self.top + self.visible_count():
+            self.refresh()
+        else:
+            self._update_scrollbar()
+
+    def show_placeholder(self, text):
+        """Show `text` in the first column while there are no rows."""
+        self.placeholder = text
+        self.refresh()
+
+    def row_count(self):
+        """Rows shown (after the quick filter)."""
+        return len(self.store) if self.view is None else len(self.view)
+
+    def store_index(self, index):
+        """Store row behind displayed row `index`."""
+        return index if self.view is None else self.view[index]
+
+    def display_row(self, index):
+        """Displayed row `index` as a list of display strings."""
+        return self.store.display_row(self.store_index(index))
+
+    def iter_display_rows(self):
+        """Yield every displayed row, in display order, as display strings (for export / clipboard)."""
+        if self.view is None:
+            return self.store.iter_display_rows()
+        return (self.store.display_row(i) for i in self.view)
+
+    # ---------------- Sort / filter ----------------
+
+    def sort_by(self, c):
+        """Header click on column `c`: ascending, then descending, then the fetched order."""
+        if c != self.sort_column:
+            self.sort_column, self.sort_desc = c, False
+        elif not self.sort_desc:
+            self.sort_desc = True
+        else:
+            self.sort_column = None
+        self.apply_view()
+
+    def set_filter(self, text):
+        """Show only rows where some column's text contains `text` (case-insensitive)."""
+        self.filter_text = text.strip().casefold()
+        self.apply_view()
+
+    def apply_view(self):
+        """Rebuild the view from the current sort and filter over every fetched row."""
+        order = self._sorted_rows() if self.sort_column is not None else None
+        if self.filter_text:
+            mask = self._filter_mask()
+            order = [i for i in (order if order is not None else range(len(self.store))) if mask[i]]
+        self.view = order
+        for c, name in enumerate(self.store.columns):
+            suffix = SORT_ARROWS[self.sort_desc] if c == self.sort_column else ""
+            self.heading(f"#{c + 1}", text=name + suffix)
+        self.top = 0
+        self.selection_remove(self.selection())
+        self.refresh()
+        if self.on_view_change:
+            self.on_view_change()
+
+    def _cached(self, cache, c, build):
+        """build(c), reused until more rows arrive in the store."""
+        entry = cache.get(c)
+        if entry is None or entry[0] != len(self.store):
+            entry = (len(self.store), build(c))
+            cache[c] = entry
+        return entry[1]
+
+    def _sorted_rows(self):
+        keys, nulls = self._cached(self._sort_keys, self.sort_column, self.store.sort_keys)
+        # NULLs first ascending and last descending, like ORDER BY in SQL Server
+        null_rows = [i for i, null in enumerate(nulls) if null]
+        rows = [i for i, null in enumerate(nulls) if not null] if null_rows else range(len(nulls))
+        ordered = sorted(rows, key=keys.__getitem__, reverse=self.sort_desc)
+        return ordered + null_rows if self.sort_desc else null_rows + ordered
+
+    def _filter_mask(self):
+        """bytearray with 1 for every store row matching the filter text."""
+        needle = self.filter_text
+        mask = bytearray(len(self.store))
+        for c in range(len(self.store.columns)):
+            text, starts = self._cached(self._search_text, c, self.store.search_text)
+            pos = text.find(needle)
+            while pos != -1:
+                row = bisect_right(starts, pos) - 1
+                mask[row] = 1
+                pos = text.find(needle, starts[row + 1])  # Next row
+        return mask
+
+    def _extend_view(self, first_new):
+        needle = self.filter_text
+        for i in range(first_new, len(self.store)):
+            if not needle or any(needle in value.casefold() for value in self.store.display_row(i)):
+                self.view.append(i)
+        if self.on_view_change:
+            self.on_view_change()
+
+    # ---------------- Viewport ----------------
+
+    def row_height(self):
+        height = ttk.Style().lookup("Treeview", "rowheight")
+        try:
+            return int(height) or DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError):
+            return DEFAULT_ROW_HEIGHT
+
+    def visible_count(self):
+        """Number of rows that fit in the widget (below the heading)."""
+        heading = self.row_height()
+        children = self.get_children()
+        if children:
+            bbox = self.bbox(children[0])
+            if bbox:
+                heading = bbox[1]
+        return max(1, (self.winfo_height() - heading) // self.row_height())
+
+    def refresh(self):
+        """Rewrite the on-screen items for rows top .. top + visible_count()."""
+        count = self.visible_count()
+        total = self.row_count()
+        self.top = max(0, min(self.top, total - count))
+        window = range(self.top, min(total, self.top + count))
+
+        if not total and self.placeholder:
+            self.delete(*self.get_children())
+            self.insert("", "end", values=[self.placeholder] + [""] * (len(self["columns"]) - 1))
+            return
+
+        items = list(self.get_children())
+        # Reuse existing items, add or drop the difference
+        for iid in items[len(window):]:
+            self.delete(iid)
+        for offset, index in enumerate(window):
+            values = self.display_row(index)
+            tag = "even" if index % 2 == 0 else "odd"
+            if offset < len(items):
+                self.item(items[offset], values=values, tags=(tag,))
+            else:
+                self.insert("", "end", values=values, tags=(tag,))
+
+        self._update_scrollbar()
+
+        if self.on_near_end and self.top + count >= total - NEAR_END_ROWS:
+            self.on_near_end()
+
+    def _update_scrollbar(self):
+        if not self.yscroll:
+            return
+        total = self.row_count()
+        if total == 0:
+            self.yscroll(0.0, 1.0)
+            return
+        count = self.visible_count()
+        self.yscroll(self.top / total, min(1.0, (self.top + count) / total))
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'."""
+        total = self.row_count()
+        if not args:
+            count = self.visible_count()
+            return (self.top / total, (self.top + count) / total) if total else (0.0, 1.0)
+
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_count()
+            self._scroll_rows(amount)
+
+    def _scroll_to(self, index):
+        self.top = index
+        self.selection_remove(self.selection())
+        self.refresh()
+        return "break"
+
+    def _scroll_rows(self, delta):
+        return self._scroll_to(self.top + delta)
+
+    def _on_mousewheel(self, event):
+        notches = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self._scroll_rows(notches * WHEEL_ROWS)
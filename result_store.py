@@ -0,0 +1,329 @@
+# result_store.py
+"""
+Typed, columnar in-memory storage for one result set.
+Each column is a compact `array.array` (ints, floats, bools, dates and
+datetimes) or a plain list for everything else, plus a NULL mask. The
+grid, export, clipboard and AI context all read from here instead of
+scraping display strings back out of a Treeview.
+Once all live stores together pass MEMORY_BUDGET, new rows spill to a
+temp file (see spill.py) and are read back from disk on demand.
+"""
+
+import pickle
+import sys
+import weakref
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+import arrow_fetch
+from spill import SpillFile
+
+try:
+    import pandas as pd  # Optional: only DataFrame export (Excel / CSV through pandas) needs it
+except ImportError:
+    pd = None
+
+EPOCH = datetime(1970, 1, 1)
+
+NUMBER_TYPES = (int, float, Decimal)  # Mutually comparable, so a column mixing them sorts by value
+
+MEMORY_BUDGET = 1024 * 1024 * 1024  # Bytes all result sets may hold in RAM before spilling to disk
+
+# kind -> array typecode (kinds not listed are stored in a list)
+TYPECODES = {
+    "int": "q",
+    "float": "d",
+    "bool": "b",
+    "datetime": "q",  # microseconds since EPOCH
+    "date": "l",  # proleptic ordinal
+}
+
+
+def column_kind(type_code):
+    """Map a DB-API type_code (pyodbc gives Python types) to a storage kind."""
+    if type_code is bool:
+        return "bool"
+    if type_code is int:
+        return "int"
+    if type_code is float:
+        return "float"
+    if type_code is datetime:
+        return "datetime"
+    if type_code is date:
+        return "date"
+    return "object"
+
+
+def _encode(kind, val):
+    if kind == "datetime":
+        if val.tzinfo is not None:
+            raise TypeError("timezone-aware datetime")
+        delta = val - EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    if kind == "date":
+        return val.toordinal()
+    return val
+
+
+def _decode(kind, raw):
+    if kind == "datetime":
+        return EPOCH + timedelta(microseconds=raw)
+    if kind == "date":
+        return date.fromordinal(raw)
+    if kind == "bool":
+        return bool(raw)
+    return raw
+
+
+SIZE_SAMPLE = 64  # Values measured per batch of an object column for the memory estimate
+
+
+def _objects_bytes(values):
+    """
+    Estimated RAM of a list of Python values: 8 bytes per list slot plus
+    sys.getsizeof of the objects, averaged over an even sample (NULLs are
+    the shared None and cost only their slot).
+    """
+    step = max(1, len(values) // SIZE_SAMPLE)
+    sample = [v for v in values[::step] if v is not None]
+    if not sample:
+        return 8 * len(values)
+    non_null = len(values) - values.count(None)
+    return 8 * len(values) + non_null * sum(map(sys.getsizeof, sample)) // len(sample)
+
+
+def display_value(val):
+    return "" if val is None else str(val)
+
+
+def _pack_chunk(kinds, rows):
+    """Compact bytes for spilled rows: typed columns as raw arrays + NULL flags, the rest pickled."""
+    columns = []
+    for c, kind in enumerate(kinds):
+        values = [row[c] for row in rows]
+        if kind in TYPECODES:
+            try:
+                raw = array(TYPECODES[kind], [0 if v is None else _encode(kind, v) for v in values])
+                columns.append((bytes(1 if v is None else 0 for v in values), raw.tobytes()))
+                continue
+            except (TypeError, OverflowError, AttributeError):
+                pass  # Stored as plain values, like a demoted column
+        columns.append(values)
+    return pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _unpack_chunk(kinds, data):
+    columns = []
+    for kind, column in zip(kinds, pickle.loads(data)):
+        if isinstance(column, tuple):
+            nulls, raw = column
+            values = array(TYPECODES[kind])
+            values.frombytes(raw)
+            column = [None if null else _decode(kind, v) for null, v in zip(nulls, values)]
+        columns.append(column)
+    return list(zip(*columns))
+
+
+_live_stores = weakref.WeakSet()  # Every ResultStore still referenced (open tabs, result cache)
+
+
+def set_memory_budget(nbytes):
+    global MEMORY_BUDGET
+    MEMORY_BUDGET = nbytes
+
+
+def resident_bytes():
+    """RAM held by all live result sets (spilled rows not included)."""
+    return sum(store.nbytes() for store in list(_live_stores))
+
+
+class ResultStore:
+    """Columnar storage for the rows of one result set."""
+
+    def __init__(self, columns, type_codes=None):
+        self.columns = list(columns)
+        type_codes = type_codes or [None] * len(self.columns)
+        self.kinds = [column_kind(t) for t in type_codes]
+        self.data = [array(TYPECODES[k]) if k in TYPECODES else [] for k in self.kinds]
+        self.nulls = [bytearray() for _ in self.columns]  # 1 = NULL
+        self.length = 0
+        self.object_bytes = 0  # Running size estimate of list-backed columns
+        self.spill = None  # SpillFile with rows spill_start.. once over the memory budget
+        self.spill_start = None
+        _live_stores.add(self)
+
+    def __len__(self):
+        return self.length
+
+    # ---------------- Writing ----------------
+
+    def _spilling(self):
+        """True if new rows go to disk; starts the spill file when the budget is first exceeded."""
+        if self.spill is None and resident_bytes() > MEMORY_BUDGET:
+            kinds = list(self.kinds)
+            self.spill = SpillFile(lambda rows: _pack_chunk(kinds, rows),
+                                   lambda data: _unpack_chunk(kinds, data))
+            # The file lives as long as the store (its tab, the result diff's previous run)
+            weakref.finalize(self, self.spill.close)
+            self.spill_start = self.length
+        return self.spill is not None
+
+    def append_rows(self, rows):
+        """Append a batch of rows (sequences of Python values) column by column."""
+        if self._spilling():
+            self.spill.append_rows(rows)
+            self.length += len(rows)
+            return
+        for c, kind in enumerate(self.kinds):
+            values = [row[c] for row in rows]
+            self._append_column(c, kind, values)
+        self.length += len(rows)
+
+    def append_arrow(self, batch):
+        """Append a pyarrow RecordBatch; typed columns are copied from its buffers in bulk."""
+        if self._spilling():
+            self.spill.append_rows(arrow_fetch.batch_rows(batch))
+            self.length += batch.num_rows
+            return
+        for c, column in enumerate(batch.columns):
+            kind = self.kinds[c]
+            encoded = arrow_fetch.column_bytes(column, kind, TYPECODES[kind]) if kind in TYPECODES else None
+            if encoded is None:
+                self._append_column(c, kind, column.to_pylist())
+            else:
+                values, nulls = encoded
+                self.data[c].frombytes(values)
+                self.nulls[c].extend(nulls)
+        self.length += batch.num_rows
+
+    def _append_column(self, c, kind, values):
+        nulls = self.nulls[c]
+        if kind not in TYPECODES:
+            self.data[c].extend(values)
+            nulls.extend(1 if v is None else 0 for v in values)
+            self.object_bytes += _objects_bytes(values)
+            return
+
+        try:
+            chunk = array(TYPECODES[kind], [0 if v is None else _encode(kind, v) for v in values])
+        except (TypeError, OverflowError, AttributeError):
+            # Value doesn't fit the typed array (huge int, tz-aware datetime, ...)
+            self._demote_to_list(c)
+            self._append_column(c, "object", values)
+            return
+        self.data[c].extend(chunk)
+        nulls.extend(1 if v is None else 0 for v in values)
+
+    def _demote_to_list(self, c):
+        kind = self.kinds[c]
+        self.data[c] = [None if self.nulls[c][i] else _decode(kind, raw)
+                        for i, raw in enumerate(self.data[c])]
+        self.kinds[c] = "object"
+        self.object_bytes += _objects_bytes(self.data[c])
+
+    # ---------------- Reading ----------------
+
+    def resident_rows(self):
+        """Rows held in the in-memory columns (the rest are in the spill file)."""
+        return self.length if self.spill is None else self.spill_start
+
+    def value(self, i, c):
+        """Typed value at row `i`, column `c` (None for NULL)."""
+        if self.spill is not None and i >= self.spill_start:
+            return self.spill.row(i - self.spill_start)[c]
+        if self.nulls[c][i]:
+            return None
+        return _decode(self.kinds[c], self.data[c][i])
+
+    def row(self, i):
+        if self.spill is not None and i >= self.spill_start:
+            return self.spill.row(i - self.spill_start)
+        return tuple(self.value(i, c) for c in range(len(self.columns)))
+
+    def display_row(self, i):
+        return [display_value(v) for v in self.row(i)]
+
+    def iter_rows(self):
+        for i in range(self.resident_rows()):
+            yield self.row(i)
+        if self.spill is not None:
+            yield from self.spill.iter_rows()
+
+    def iter_display_rows(self):
+        for row in self.iter_rows():
+            yield [display_value(v) for v in row]
+
+    def column_values(self, c):
+        """All typed values of column `c` as a list (None for NULL)."""
+        kind = self.kinds[c]
+        nulls = self.nulls[c]
+        if kind == "object":
+            values = list(self.data[c])
+        else:
+            values = [None if nulls[i] else _decode(kind, raw) for i, raw in enumerate(self.data[c])]
+        if self.spill is not None:
+            values.extend(row[c] for row in self.spill.iter_rows())
+        return values
+
+    # ---------------- Sort / filter keys ----------------
+
+    def sort_keys(self, c):
+        """
+        (keys, nulls) to sort rows by column `c`. In-memory typed columns sort
+        on their raw array (ints, microseconds, ordinals) without decoding;
+        strings are casefolded like SQL Server's default collation. A column
+        mixing numeric types (int, float, Decimal) sorts by value; any other
+        mix falls back to comparing display strings.
+        """
+        if self.spill is None and self.kinds[c] in TYPECODES:
+            return self.data[c], self.nulls[c]
+        values = self.column_values(c)
+        nulls = bytes(v is None for v in values)
+        types = {type(v) for v in values if v is not None}
+        if len(types) > 1 and not all(issubclass(t, NUMBER_TYPES) for t in types):
+            return [display_value(v).casefold() for v in values], nulls
+        return [v.casefold() if type(v) is str else v for v in values], nulls
+
+    def search_text(self, c):
+        """
+        (text, starts) for the quick filter: the casefolded display strings of
+        column `c` joined by newlines, and the offset where each row starts
+        (plus the end), so one str.find scans the whole column.
+        """
+        strings = [display_value(v).casefold().replace("\n", " ") for v in self.column_values(c)]
+        starts = array("q", [0])
+        starts.extend(accumulate(len(s) + 1 for s in strings))
+        return "\n".join(strings), starts
+
+    def close(self):
+        """Delete the spill file, if any (the store is unusable afterwards if it spilled)."""
+        if self.spill is not None:
+            self.spill.close()
+
+    def nbytes(self):
+        """Approximate memory used by the stored values (spilled rows not included)."""
+        total = self.object_bytes
+        for c, kind in enumerate(self.kinds):
+            total += len(self.nulls[c])
+            if kind in TYPECODES:
+                total += self.data[c].itemsize * len(self.data[c])
+        return total
+
+
+def store_dataframe(store):
+    """DataFrame of a ResultStore with its typed values (numbers stay numbers)."""
+    if pd is None:
+        raise ImportError("DataFrame export needs pandas (pip install pandas)")
+    df = pd.DataFrame({i: store.column_values(i) for i in range(len(store.columns))})
+    df.columns = store.columns
+    return df
+
+
+def save_dataframe(df, file_path, format_type):
+    """Write `df` to `file_path` as "csv" or "excel" (shared by the GUI and cli.py)."""
+    if format_type == "csv":
+        df.to_csv(file_path, index=False)
+    else:
+        df.to_excel(file_path, index=False, engine="openpyxl")
@@ -0,0 +1,300 @@
+# schema_catalog.py
+"""
+Schema catalog: the tables, views, routines, columns and indexes of a
+database, loaded on a background thread and kept per connection string.
+The catalog is saved to a cache file in SCHEMA_CACHE_DIR. A later launch
+shows it straight away, then refreshes it from the server. On SQL Server the
+refresh is incremental: sys.objects is listed with modify_date, and only the
+columns and indexes of new or changed objects are fetched again. SQLite and
+DuckDB files are small and local, so they are reloaded whole.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import pool
+from backends import backend_for
+
+SCHEMA_CACHE_DIR = "schema_cache"
+CACHE_VERSION = 1
+IN_LIST_SIZE = 1000  # object_ids per "IN (...)" (SQL Server allows 2100 parameters)
+FULL_RELOAD_SHARE = 0.25  # Fetch all columns in one pass once this share of objects changed
+
+# User objects worth knowing about: tables, views, procedures and functions
+OBJECT_TYPES = "('U', 'V', 'P', 'FN', 'IF', 'TF')"
+
+OBJECTS_SQL = f"""
+SELECT o.object_id, s.name, o.name, RTRIM(o.type), o.modify_date
+FROM sys.objects o JOIN sys.schemas s ON s.schema_id = o.schema_id
+WHERE o.is_ms_shipped = 0 AND o.type IN {OBJECT_TYPES}
+"""
+
+COLUMNS_SQL = f"""
+SELECT c.object_id, c.name, t.name, c.max_length, c.precision, c.scale, c.is_nullable
+FROM sys.columns c
+JOIN sys.types t ON t.user_type_id = c.user_type_id
+JOIN sys.objects o ON o.object_id = c.object_id
+WHERE o.is_ms_shipped = 0 AND o.type IN {OBJECT_TYPES}{{where}}
+ORDER BY c.object_id, c.column_id
+"""
+
+INDEXES_SQL = """
+SELECT i.object_id, i.name, i.type_desc, i.is_unique, i.is_primary_key, c.name
+FROM sys.indexes i
+JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+JOIN sys.objects o ON o.object_id = i.object_id
+WHERE o.is_ms_shipped = 0 AND i.name IS NOT NULL AND ic.is_included_column = 0{where}
+ORDER BY i.object_id, i.index_id, ic.key_ordinal
+"""
+
+_catalogs = {}  # conn_str -> Catalog
+_loading = set()  # conn_strs with a load in flight
+_lock = threading.Lock()
+
+
+def _type_name(name, max_length, precision, scale):
+    """SQL Server type as written in DDL, e.g. nvarchar(50), decimal(10,2)."""
+    if name in ("varchar", "char", "varbinary", "binary"):
+        return f"{name}({'max' if max_length == -1 else max_length})"
+    if name in ("nvarchar", "nchar"):
+        return f"{name}({'max' if max_length == -1 else max_length // 2})"
+    if name in ("decimal", "numeric"):
+        return f"{name}({precision},{scale})"
+    if name in ("datetime2", "datetimeoffset", "time") and scale != 7:
+        return f"{name}({scale})"
+    return name
+
+
+class Catalog:
+    """
+    Schema of one database. Per object key (object_id on SQL Server,
+    "schema.name" elsewhere):
+      objects[key]  = (schema, name, type, modify_date)
+      columns[key]  = [(column, type, nullable), ...]
+      indexes[key]  = [(index, kind, unique, primary_key, "col1, col2"), ...]
+    Repeated strings (schemas, types) are interned to keep 20k objects small.
+    """
+
+    def __init__(self, objects=None, columns=None, indexes=None):
+        self.objects = objects or {}
+        self.columns = columns or {}
+        self.indexes = indexes or {}
+        self.refreshed = None  # Time of the last refresh from the server (None = cache file only)
+        self.error = None  # Message of the last failed refresh
+        self._by_name = None
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _names(self):
+        """Lowercased "schema.name" and bare name -> object keys (built on first lookup)."""
+        if self._by_name is None:
+            by_name = {}
+            for key, (schema, name, _, _) in self.objects.items():
+                by_name.setdefault(f"{schema}.{name}".lower(), []).append(key)
+                by_name.setdefault(name.lower(), []).append(key)
+            self._by_name = by_name
+        return self._by_name
+
+    def find(self, name):
+        """Object key for "name" or "schema.name" (brackets allowed, any case), or None."""
+        name = re.sub(r"[\[\]\"]", "", name).lower()
+        keys = self._names().get(name)
+        return keys[0] if keys else None
+
+    def columns_of(self, name):
+        """[(column, type, nullable)] of a table / view by name ([] if unknown)."""
+        key = self.find(name)
+        return self.columns.get(key, []) if key is not None else []
+
+    def indexes_of(self, name):
+        key = self.find(name)
+        return self.indexes.get(key, []) if key is not None else []
+
+    def object_names(self, types=None):
+        """["schema.name", ...] of every object (optionally only these sys.objects types)."""
+        return sorted(f"{schema}.{name}" for schema, name, kind, _ in self.objects.values()
+                      if types is None or kind in types)
+
+    # ---------------- Cache file ----------------
+
+    def to_json(self):
+        return {
+            "version": CACHE_VERSION,
+            "objects": [[key, *obj] for key, obj in self.objects.items()],
+            "columns": [[key, cols] for key, cols in self.columns.items()],
+            "indexes": [[key, idx] for key, idx in self.indexes.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        if data.get("version") != CACHE_VERSION:
+            return None
+        intern = sys.intern
+        objects = {key: (intern(schema), name, intern(kind), modified)
+                   for key, schema, name, kind, modified in data["objects"]}
+        columns = {key: [(name, intern(kind), nullable) for name, kind, nullable in cols]
+                   for key, cols in data["columns"]}
+        indexes = {key: [tuple(index) for index in idx] for key, idx in data["indexes"]}
+        return cls(objects, columns, indexes)
+
+
+def _cache_path(conn_str):
+    digest = hashlib.sha1(conn_str.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SCHEMA_CACHE_DIR, f"{digest}.json")
+
+
+def load_cache(conn_str):
+    """Catalog saved for `conn_str` by an earlier session, or None."""
+    try:
+        with open(_cache_path(conn_str), "r", encoding="utf-8") as f:
+            return Catalog.from_json(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # Missing, unreadable or from another version: reload from the server
+
+
+def save_cache(conn_str, catalog):
+    """Write the catalog atomically, so a crash mid-write can't leave a torn file."""
+    os.makedirs(SCHEMA_CACHE_DIR, exist_ok=True)
+    path = _cache_path(conn_str)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(catalog.to_json(), f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+# ---------------- Loading from the server ----------------
+
+def _fetch(conn, sql, params=None):
+    cursor = conn.cursor()
+    try:
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _fetch_for(conn, sql, object_ids):
+    """Rows of `sql` for these object_ids (all objects when None), in IN-list chunks."""
+    if object_ids is None:
+        return _fetch(conn, sql.format(where=""))
+    rows = []
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), IN_LIST_SIZE):
+        chunk = object_ids[start:start + IN_LIST_SIZE]
+        where = f" AND o.object_id IN ({', '.join('?' * len(chunk))})"
+        rows.extend(_fetch(conn, sql.format(where=where), chunk))
+    return rows
+
+
+def _refresh_mssql(conn, old):
+    """New Catalog from sys.objects, re-reading columns / indexes only for changed objects."""
+    intern = sys.intern
+    objects = {row[0]: (intern(row[1]), row[2], intern(row[3]), row[4].isoformat() if row[4] else None)
+               for row in _fetch(conn, OBJECTS_SQL)}
+    changed = [key for key, obj in objects.items()
+               if key not in old.objects or old.objects[key][3] != obj[3]]
+
+    if len(changed) > FULL_RELOAD_SHARE * len(objects):
+        changed_ids = None  # Most of it is new: one pass is cheaper than many IN lists
+        columns, indexes = {}, {}
+    else:
+        changed_ids = changed
+        # Unchanged objects keep their cached columns; dropped ones fall out here
+        columns = {key: cols for key, cols in old.columns.items() if key in objects}
+        indexes = {key: idx for key, idx in old.indexes.items() if key in objects}
+        for key in changed:
+            columns.pop(key, None)
+            indexes.pop(key, None)
+
+    if changed_ids is None or changed_ids:
+        for object_id, name, type_name, max_length, precision, scale, nullable in \
+                _fetch_for(conn, COLUMNS_SQL, changed_ids):
+            column_type = intern(_type_name(type_name, max_length, precision, scale))
+            columns.setdefault(object_id, []).append((name, column_type, bool(nullable)))
+
+        grouped = {}  # (object_id, index) -> [kind, unique, primary key, [columns]]
+        for object_id, index, kind, unique, primary, column in _fetch_for(conn, INDEXES_SQL, changed_ids):
+            entry = grouped.setdefault((object_id, index), [intern(kind), bool(unique), bool(primary), []])
+            entry[3].append(column)
+        for (object_id, index), (kind, unique, primary, cols) in grouped.items():
+            indexes.setdefault(object_id, []).append((index, kind, unique, primary, ", ".join(cols)))
+
+    return Catalog(objects, columns, indexes)
+
+
+def _refresh_local(conn, backend):
+    """SQLite / DuckDB: list tables and their columns through the backend (no modify_date)."""
+    objects, columns = {}, {}
+    for schema, name, kind in backend.tables(conn):
+        key = f"{schema}.{name}"
+        objects[key] = (sys.intern(schema), name, "V" if "VIEW" in kind.upper() else "U", None)
+        columns[key] = [(column, sys.intern(str(column_type or "")), None)
+                        for column, column_type in backend.columns(conn, schema, name)]
+    return Catalog(objects, columns)
+
+
+def refresh(conn_str):
+    """Bring the catalog of `conn_str` up to date from the server (blocking) and save it."""
+    old = get(conn_str) or Catalog()
+    backend = backend_for(conn_str)
+    conn = pool.checkout(conn_str)
+    try:
+        if backend.name == "mssql":
+            catalog = _refresh_mssql(conn, old)
+        else:
+            catalog = _refresh_local(conn, backend)
+    except Exception:
+        pool.discard(conn)
+        raise
+    pool.checkin(conn_str, conn)
+    catalog.refreshed = time.time()
+    with _lock:
+        _catalogs[conn_str] = catalog
+    save_cache(conn_str, catalog)
+    return catalog
+
+
+def _load(conn_str):
+    try:
+        if get(conn_str) is None:
+            cached = load_cache(conn_str)
+            if cached is not None:
+                with _lock:
+                    _catalogs.setdefault(conn_str, cached)
+        refresh(conn_str)
+    except Exception as e:
+        with _lock:
+            catalog = _catalogs.setdefault(conn_str, Catalog())
+            catalog.error = str(e)
+    finally:
+        with _lock:
+            _loading.discard(conn_str)
+
+
+def load_async(conn_str):
+    """Load the cached catalog and refresh it on a daemon thread (no-op if already loading)."""
+    with _lock:
+        if conn_str in _loading:
+            return
+        _loading.add(conn_str)
+    threading.Thread(target=_load, args=(conn_str,), daemon=True).start()
+
+
+def get(conn_str):
+    """The catalog of `conn_str` as far as it is loaded, or None."""
+    with _lock:
+        return _catalogs.get(conn_str)
+
+
+def is_loading(conn_str):
+    with _lock:
+        return conn_str in _loading
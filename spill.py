@@ -0,0 +1,118 @@
+# spill.py
+"""
+Spill files: rows of an oversized result kept on disk instead of in RAM.
+Rows are packed in chunks of SPILL_CHUNK_ROWS and appended to a temp file;
+reads go through a memory map and a small cache of decoded chunks, so the
+grid can page through a spilled result without loading it back.
+Files are deleted on close() and, for anything still open, at exit.
+"""
+
+import atexit
+import mmap
+import os
+import pickle
+import tempfile
+from array import array
+from collections import OrderedDict
+
+SPILL_CHUNK_ROWS = 256  # Rows per packed chunk (the unit of a disk read)
+CACHED_CHUNKS = 64  # Decoded chunks kept per file (covers a screen plus scrolling)
+SPILL_PREFIX = "sqlplayground_"
+
+_open_files = set()
+
+
+def _pickle_rows(rows):
+    return pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class SpillFile:
+    """
+    Append-only row file, read back by row index.
+    `pack(rows) -> bytes` / `unpack(bytes) -> rows` encode a chunk (pickle by default).
+    """
+
+    def __init__(self, pack=_pickle_rows, unpack=pickle.loads):
+        self._pack = pack
+        self._unpack = unpack
+        fd, self.path = tempfile.mkstemp(prefix=SPILL_PREFIX, suffix=".spill")
+        self._file = os.fdopen(fd, "w+b")
+        self._offsets = array("q", [0])  # Byte offset of each chunk, plus the end
+        self._pending = []  # Rows not yet written (less than a chunk)
+        self._map = None
+        self._chunks = OrderedDict()  # chunk index -> list of rows
+        self.length = 0
+        _open_files.add(self)
+
+    def __len__(self):
+        return self.length
+
+    def append_rows(self, rows):
+        self._pending.extend(tuple(row) for row in rows)
+        self.length += len(rows)
+        while len(self._pending) >= SPILL_CHUNK_ROWS:
+            self._write_chunk(self._pending[:SPILL_CHUNK_ROWS])
+            del self._pending[:SPILL_CHUNK_ROWS]
+
+    def _write_chunk(self, rows):
+        data = self._pack(rows)
+        self._file.seek(self._offsets[-1])
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def _chunk(self, n):
+        rows = self._chunks.get(n)
+        if rows is not None:
+            self._chunks.move_to_end(n)
+            return rows
+        end = self._offsets[n + 1]
+        if self._map is None or len(self._map) < end:
+            # The file grew since it was mapped
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        rows = self._unpack(self._map[self._offsets[n]:end])
+        self._chunks[n] = rows
+        if len(self._chunks) > CACHED_CHUNKS:
+            self._chunks.popitem(last=False)
+        return rows
+
+    def row(self, i):
+        n, offset = divmod(i, SPILL_CHUNK_ROWS)
+        if n == len(self._offsets) - 1:
+            return self._pending[offset]  # Still in the unwritten tail
+        return self._chunk(n)[offset]
+
+    def iter_rows(self):
+        for n in range(len(self._offsets) - 1):
+            yield from self._chunk(n)
+        yield from list(self._pending)
+
+    def nbytes(self):
+        """Bytes on disk (RAM use is the chunk cache and the offsets only)."""
+        return self._offsets[-1]
+
+    def close(self):
+        """Drop the file; safe to call more than once."""
+        if self._file is None:
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        self._file = None
+        self._chunks.clear()
+        self._pending = []
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        _open_files.discard(self)
+
+
+@atexit.register
+def close_all():
+    """Delete every spill file still open (runs at interpreter exit)."""
+    for spill in list(_open_files):
+        spill.close()
@@ -0,0 +1,159 @@
+# sql_text.py
+"""
+Lightweight T-SQL text helpers shared by the result cache, paging and
+batch splitting. Nothing here parses SQL properly; it only tokenizes far
+enough to skip string literals, quoted names and comments.
+"""
+
+import re
+
+# Literals / quoted names / comments / whitespace / words / single characters
+TOKEN_RE = re.compile(
+    r"N?'(?:[^']|'')*'|\[[^\]]*\]|\"[^\"]*\"|--[^\n]*|/\*.*?\*/|\s+|[^\s'\[\"/(),;-]+|.",
+    re.DOTALL
+)
+
+# Statements that can change data or schema; any of them makes a batch read-write
+WRITE_KEYWORDS = {
+    "insert", "update", "delete", "merge", "truncate", "create", "alter", "drop",
+    "exec", "execute", "into", "grant", "revoke", "deny", "backup", "restore",
+    "dbcc", "bulk", "set", "declare", "begin", "commit", "rollback", "use",
+}
+
+
+def tokenize(sql):
+    return TOKEN_RE.findall(sql)
+
+
+def is_code(token):
+    """False for literals, quoted names, comments and whitespace."""
+    return not (token[0] in "'[\"" or token.startswith("N'") or token.startswith("--")
+                or token.startswith("/*") or token.isspace())
+
+
+def is_comment(token):
+    return token.startswith("--") or token.startswith("/*")
+
+
+def words(sql):
+    """Lowercased bare words of `sql`, skipping literals, quoted names and comments."""
+    for token in tokenize(sql):
+        if is_code(token):
+            for word in re.findall(r"[A-Za-z_]+", token):
+                yield word.lower()
+
+
+def normalize_sql(sql):
+    """Drop comments, collapse whitespace and trailing semicolons (string literals untouched)."""
+    parts = []
+    for token in tokenize(sql):
+        if is_comment(token) or token.isspace():
+            token = " "
+        if token == " " and (not parts or parts[-1] == " "):
+            continue
+        parts.append(token)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def is_read_only(sql):
+    """True if `sql` is a plain SELECT / WITH ... SELECT batch that cannot write."""
+    batch_words = list(words(sql))
+    if not batch_words or batch_words[0] not in ("select", "with"):
+        return False
+    return not any(word in WRITE_KEYWORDS for word in batch_words)
+
+
+def is_single_statement(sql):
+    """True if `sql` has no top-level ';' other than a trailing one."""
+    code = [t for t in tokenize(normalize_sql(sql)) if is_code(t)]
+    return ";" not in code
+
+
+def split_order_by(sql):
+    """
+    Split a SELECT into (body, order_by) at its last top-level ORDER BY.
+    order_by is the clause text including the keywords, or None.
+    """
+    sql = normalize_sql(sql)
+    tokens = tokenize(sql)
+    depth = 0
+    order_at = None
+    position = 0
+    for i, token in enumerate(tokens):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.lower() == "order":
+            rest = [t for t in tokens[i + 1:i + 4] if not t.isspace()]
+            if rest and rest[0].lower() == "by":
+                order_at = position
+        position += len(token)
+
+    if order_at is None:
+        return sql, None
+    return sql[:order_at].rstrip(), sql[order_at:]
+
+
+def _go_count(line_tokens):
+    """Repeat count if the line is a batch separator ("GO" or "GO n"), else None."""
+    code = [t for t in line_tokens if is_code(t)]
+    if not code or code[0].upper() != "GO" or len(code) > 2:
+        return None
+    if len(code) == 2:
+        return int(code[1]) if code[1].isdigit() else None
+    return 1
+
+
+def split_batches(script):
+    """
+    Split a script on SSMS-style GO separator lines ("GO", "GO 5").
+    GO inside string literals, quoted names or comments does not split.
+    Returns the list of batch texts; batches with no code are dropped.
+    """
+    batches = []
+    current = []  # Tokens of the batch being built
+    line = []  # Tokens of the current line
+
+    def end_line():
+        count = _go_count(line)
+        if count is None:
+            current.extend(line)
+            return
+        batch = "".join(current).strip()
+        if any(is_code(t) for t in tokenize(batch)):
+            batches.extend([batch] * count)
+        current.clear()
+
+    for token in tokenize(script):
+        if token.isspace() and "\n" in token:
+            end_line()
+            line = []
+            current.append(token)
+        else:
+            line.append(token)
+    end_line()
+
+    batch = "".join(current).strip()
+    if any(is_code(t) for t in tokenize(batch)):
+        batches.append(batch)
+    return batches
+
+
+def split_statements(sql, is_complete=None):
+    """
+    Split `sql` into statements at top-level ';' (for engines that run one
+    statement per execute, e.g. SQLite). `is_complete(text)` can veto a split
+    that lands inside a compound statement such as a trigger body.
+    """
+    statements = []
+    current = []
+    for token in tokenize(sql):
+        current.append(token)
+        if token == ";":
+            text = "".join(current)
+            if is_complete is None or is_complete(text):
+                statements.append(text)
+                current = []
+    statements.append("".join(current))
+    return [s.strip() for s in statements if any(is_code(t) and t != ";" for t in tokenize(s))]
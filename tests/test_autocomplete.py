@@ -0,0 +1,67 @@
+from autocomplete import PrefixIndex, completions, quote_name, table_aliases
+from schema_catalog import Catalog
+
+
+def _catalog():
+    return Catalog(
+        objects={
+            1: ("dbo", "Orders", "U", None),
+            2: ("dbo", "Customers", "U", None),
+            3: ("sales", "OrderLines", "V", None),
+        },
+        columns={
+            1: [("OrderId", "int", False), ("CustomerId", "int", False), ("Total", "money", True)],
+            2: [("CustomerId", "int", False), ("Name", "nvarchar(50)", True)],
+            3: [("OrderId", "int", False), ("Qty", "int", False)],
+        },
+    )
+
+
+def complete(text, catalog=None):
+    return completions(text, len(text), catalog)
+
+
+def test_prefix_index_lookup_is_case_insensitive_and_limited():
+    index = PrefixIndex([("Orders", "table"), ("OrderLines", "view"), ("Customers", "table")])
+    assert index.lookup("ord") == [("OrderLines", "view"), ("Orders", "table")]
+    assert index.lookup("ORD", limit=1) == [("OrderLines", "view")]
+    assert index.lookup("x") == []
+
+
+def test_table_aliases():
+    aliases = table_aliases("SELECT * FROM dbo.Orders o JOIN [dbo].[Customers] AS c ON c.CustomerId = o.CustomerId WHERE 1=1")
+    assert aliases == {"orders": "dbo.Orders", "o": "dbo.Orders",
+                       "customers": "[dbo].[Customers]", "c": "[dbo].[Customers]"}
+
+
+def test_alias_qualifier_lists_the_tables_columns():
+    text = "SELECT * FROM dbo.Orders o WHERE o.Cu"
+    prefix, items = complete(text, _catalog())
+    assert prefix == "Cu"
+    assert items == [("CustomerId", "column")]
+
+
+def test_schema_qualifier_lists_its_objects():
+    prefix, items = complete("SELECT * FROM dbo.", _catalog())
+    assert prefix == ""
+    assert items == [("Customers", "table"), ("Orders", "table")]
+    _, items = complete("SELECT * FROM sales.Or", _catalog())
+    assert items == [("OrderLines", "view")]
+
+
+def test_table_context_lists_objects():
+    _, items = complete("SELECT * FROM Cus", _catalog())
+    assert items == [("Customers", "table")]
+
+
+def test_keywords_and_columns():
+    _, items = complete("SELECT * FROM dbo.Orders WHERE Tot", _catalog())
+    assert items[0] == ("Total", "column")
+    _, items = complete("SEL")
+    assert items == [("SELECT", "keyword")]
+
+
+def test_quote_name():
+    assert quote_name("Orders") == "Orders"
+    assert quote_name("Order Lines") == "[Order Lines]"
+    assert quote_name("select") == "[select]"
@@ -0,0 +1,134 @@
+import queue
+import sqlite3
+
+import pytest
+
+import engine
+import pool
+from engine import END_EVENTS, QueryWorker, dispatch, iter_query_events
+
+CONN_STR = "sqlite::memory:"
+
+
+def setup_function():
+    pool.reset_pool()
+
+
+def kinds(events):
+    return [kind for kind, _ in events]
+
+
+def run_worker(worker, timeout=5):
+    """All events of a started worker up to and including its end event."""
+    events = []
+    while True:
+        event = worker.get(timeout=timeout)
+        events.append(event)
+        if event[0] in END_EVENTS:
+            return events
+
+
+def test_single_result_set():
+    events = list(iter_query_events(CONN_STR, "SELECT 1 AS a, 'x' AS b"))
+    assert kinds(events) == ["columns", "rows", "end_result", "timings"]
+    assert [name for name, _ in events[0][1]] == ["a", "b"]
+    assert events[1][1] == [(1, "x")]
+    assert events[2][1] == 1
+
+
+def test_multiple_result_sets():
+    events = list(iter_query_events(CONN_STR, "SELECT 1 AS a; SELECT 2 AS b UNION ALL SELECT 3"))
+    assert kinds(events) == ["columns", "rows", "end_result", "columns", "rows", "end_result", "timings"]
+    assert events[4][1] == [(2,), (3,)]
+    assert events[5][1] == 2
+
+
+def test_rows_stream_in_batches():
+    sql = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1234) "
+           "SELECT i FROM n")
+    events = list(iter_query_events(CONN_STR, sql))
+    batches = [payload for kind, payload in events if kind == "rows"]
+    assert len(batches[0]) == engine.FIRST_BATCH_SIZE
+    assert sum(len(rows) for rows in batches) == 1234
+    assert ("end_result", 1234) in events
+
+
+def test_go_batches():
+    events = list(iter_query_events(CONN_STR, "CREATE TABLE t (a int)\nGO\nSELECT 2 AS b"))
+    assert kinds(events) == [
+        "batches", "batch_start", "rowcount", "batch_end",
+        "batch_start", "columns", "rows", "end_result", "batch_end", "timings",
+    ]
+    assert events[0][1] == 2
+    assert events[4][1] == (2, 2, "SELECT 2 AS b")
+    assert events[8][1]["rows"] == 1 and events[8][1]["error"] is None
+
+
+def test_failing_batch_stops_the_script():
+    with pytest.raises(sqlite3.OperationalError):
+        list(iter_query_events(CONN_STR, "SELECT 1\nGO\nSELECT * FROM missing\nGO\nSELECT 3"))
+
+
+def test_continue_on_error():
+    events = list(iter_query_events(CONN_STR, "SELECT 1\nGO\nSELECT * FROM missing\nGO\nSELECT 3",
+                                    continue_on_error=True))
+    ends = [payload for kind, payload in events if kind == "batch_end"]
+    assert [end["error"] is None for end in ends] == [True, False, True]
+    assert "missing" in ends[1]["error"]
+    assert ("rows", [(3,)]) in events
+
+
+def test_connection_goes_back_to_the_pool_after_a_clean_run(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pool, "checkin", lambda conn_str, conn: calls.append("checkin"))
+    monkeypatch.setattr(pool, "discard", lambda conn: calls.append("discard"))
+    list(iter_query_events(CONN_STR, "SELECT 1"))
+    assert calls == ["checkin"]
+
+
+def test_connection_is_discarded_after_an_error(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pool, "checkin", lambda conn_str, conn: calls.append("checkin"))
+    monkeypatch.setattr(pool, "discard", lambda conn: calls.append("discard"))
+    with pytest.raises(sqlite3.OperationalError):
+        list(iter_query_events(CONN_STR, "SELECT * FROM missing"))
+    assert calls == ["discard"]
+
+
+def test_worker_done_and_error():
+    events = run_worker(QueryWorker(CONN_STR, "SELECT 1 AS a").start())
+    assert kinds(events)[-1] == "done"
+    events = run_worker(QueryWorker(CONN_STR, "SELECT * FROM missing").start())
+    assert events[-1][0] == "error"
+    assert isinstance(events[-1][1], sqlite3.OperationalError)
+
+
+def test_worker_cancel_while_waiting_for_the_consumer():
+    sql = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000) "
+           "SELECT i FROM n")
+    worker = QueryWorker(CONN_STR, sql, prefetch_rows=1).start()
+    assert worker.get(timeout=5)[0] == "columns"
+    worker.thread.join(0.2)
+    assert worker.thread.is_alive()  # Blocked on the full prefetch buffer
+    worker.cancel()
+    worker.thread.join(5)
+    events = []
+    while True:
+        try:
+            events.append(worker.get(timeout=0))
+        except queue.Empty:
+            break
+    assert kinds(events)[-1] == "cancelled"
+    assert "done" not in kinds(events)
+
+
+def test_dispatch():
+    seen = []
+    handlers = {"rows": seen.append}
+    assert dispatch(("rows", [1]), handlers) is False
+    assert dispatch(("columns", []), handlers) is False  # No handler: skipped
+    assert seen == [[1]]
+    for kind in END_EVENTS:
+        assert dispatch((kind, None), {}) is True
+    assert dispatch(("done", None), {"done": seen.append}) is True
+    assert seen == [[1], None]
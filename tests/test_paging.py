@@ -0,0 +1,71 @@
+from paging import PagedQuery, can_page
+
+
+def _page_through(pager, rows):
+    """Feed the first page of `rows` (already in query order) through the pager."""
+    pager.next_page()
+    pager.record_rows(rows[:pager.page_size])
+    pager.end_page()
+
+
+def test_offset_first_page():
+    pager = PagedQuery("SELECT id, name FROM t ORDER BY id", page_size=2)
+    pager.bind_columns(["id", "name"])
+    sql, params = pager.next_page()
+    assert sql.endswith("ORDER BY id\nOFFSET 0 ROWS FETCH NEXT 2 ROWS ONLY")
+    assert params is None
+
+
+def test_keyset_page_ascending():
+    pager = PagedQuery("SELECT id, name FROM t ORDER BY id", page_size=2)
+    pager.bind_columns(["id", "name"])
+    _page_through(pager, [(1, "a"), (2, "b")])
+    sql, params = pager.next_page()
+    assert "FROM (\nSELECT id, name FROM t\n) AS _page\nWHERE [id] >= ?\nORDER BY [id] ASC" in sql
+    assert params == [2]
+    assert pager.skip == 1
+
+
+def test_keyset_descending_keeps_null_keys():
+    pager = PagedQuery("SELECT id FROM t ORDER BY id DESC", page_size=2)
+    pager.bind_columns(["id"])
+    _page_through(pager, [(9,), (8,)])
+    sql, params = pager.next_page()
+    assert "WHERE ([id] <= ? OR [id] IS NULL)\nORDER BY [id] DESC" in sql
+    assert params == [8]
+
+
+def test_page_ending_on_null_key_uses_offset():
+    pager = PagedQuery("SELECT id FROM t ORDER BY id DESC", page_size=2)
+    pager.bind_columns(["id"])
+    _page_through(pager, [(1,), (None,)])
+    sql, params = pager.next_page()
+    assert "OFFSET 2 ROWS" in sql and params is None
+
+
+def test_cte_is_hoisted_in_front_of_the_wrapper():
+    sql = "WITH c (id) AS (SELECT id FROM t), d AS (SELECT 1 AS x)\nSELECT id FROM c ORDER BY id"
+    assert can_page(sql) is None
+    pager = PagedQuery(sql, page_size=2)
+    pager.bind_columns(["id"])
+    with_clause = "WITH c (id) AS (SELECT id FROM t), d AS (SELECT 1 AS x) "
+    assert pager.count_sql() == with_clause + "SELECT COUNT_BIG(*) FROM (\nSELECT id FROM c\n) AS _count"
+    _page_through(pager, [(1,), (2,)])
+    sql, _ = pager.next_page()
+    assert sql.startswith(with_clause + "SELECT TOP (3) * FROM (\nSELECT id FROM c\n) AS _page")
+
+
+def test_unnamed_or_duplicate_columns_fall_back_to_offset():
+    for columns in (["id", "ID"], ["id", ""]):
+        pager = PagedQuery("SELECT a.id, b.id FROM a JOIN b ON a.k = b.k ORDER BY id", page_size=2)
+        pager.bind_columns(columns)
+        assert pager.count_sql() is None
+        _page_through(pager, [(1, 1), (2, 2)])
+        sql, params = pager.next_page()
+        assert "OFFSET 2 ROWS" in sql and params is None
+
+
+def test_can_page_rejects_top_and_writes():
+    assert can_page("SELECT TOP 10 * FROM t") is not None
+    assert can_page("DELETE FROM t") is not None
+    assert can_page("SELECT * FROM t") is None
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import backends
+import pool
+
+CONN_STR = "sqlite::memory:"
+
+
+def setup_function():
+    pool.reset_pool()
+
+
+def test_clean_connection_is_reused():
+    conn = pool.checkout(CONN_STR)
+    pool.checkin(CONN_STR, conn)
+    assert pool.checkout(CONN_STR) is conn
+
+
+def test_open_transaction_is_not_pooled():
+    conn = pool.checkout(CONN_STR)
+    conn.cursor().execute("BEGIN")
+    pool.checkin(CONN_STR, conn)
+    assert pool.checkout(CONN_STR) is not conn
+
+
+def test_fake_mssql_connection_is_reused(monkeypatch):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+    import fake_pyodbc
+    monkeypatch.setattr(backends, "pyodbc", fake_pyodbc)
+    conn_str = "DRIVER={ODBC Driver 18 for SQL Server};SERVER=x;DATABASE=test;"
+    connects = fake_pyodbc.connects
+    conn = pool.checkout(conn_str)
+    pool.checkin(conn_str, conn)
+    assert pool.checkout(conn_str) is conn
+    assert fake_pyodbc.connects == connects + 1
+    pool.checkin(conn_str, conn)
@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+
+from query_params import bind_parameters, find_parameters, parse_value
+
+
+def test_placeholders_in_order_skipping_literals_and_globals():
+    sql = "SELECT * FROM t WHERE a = @Id AND b = @name -- @c\nAND c = '@d' AND d = @id AND e = @@ROWCOUNT"
+    assert find_parameters(sql) == ["Id", "name"]
+    assert bind_parameters(sql, {"ID": 1, "name": "x"}) == (
+        "SELECT * FROM t WHERE a = ? AND b = ? -- @c\nAND c = '@d' AND d = ? AND e = @@ROWCOUNT", [1, "x", 1])
+
+
+def test_missing_value_is_null():
+    assert bind_parameters("SELECT @a", {}) == ("SELECT ?", [None])
+
+
+def test_named_exec_arguments_are_not_placeholders():
+    sql = "EXEC dbo.GetOrders @CustomerId = 5"
+    assert find_parameters(sql) == []
+    assert bind_parameters(sql, {}) == (sql, [])
+
+
+def test_named_exec_argument_value_is_a_placeholder():
+    sql = "EXEC dbo.GetOrders @CustomerId = @id, @Top = 10; EXEC dbo.Other @id"
+    assert find_parameters(sql) == ["id"]
+    assert bind_parameters(sql, {"id": 3}) == (
+        "EXEC dbo.GetOrders @CustomerId = ?, @Top = 10; EXEC dbo.Other ?", [3, 3])
+
+
+def test_sp_executesql():
+    sql = "EXEC sp_executesql N'SELECT * FROM t WHERE id = @id', N'@id int', @id = 3"
+    assert find_parameters(sql) == []
+    assert bind_parameters(sql, {"id": 1}) == (sql, [])
+
+
+def test_declare_list_with_subquery():
+    sql = "DECLARE @a int = (SELECT 1), @b int = 2; SELECT @a, @b"
+    assert find_parameters(sql) == []
+    assert bind_parameters(sql, {}) == (sql, [])
+
+
+def test_declare_list_ends_at_statement_without_semicolon():
+    sql = "DECLARE @a int = 1\nSELECT @a, @c"
+    assert find_parameters(sql) == ["c"]
+
+
+def test_routine_definition_has_no_placeholders():
+    assert find_parameters("CREATE PROCEDURE dbo.P @a int AS SELECT @a") == []
+
+
+def test_parse_value():
+    assert parse_value("42") == 42
+    assert parse_value("1.50") == Decimal("1.50")
+    assert parse_value("2024-01-31") == date(2024, 1, 31)
+    assert parse_value(" NULL ") is None
+    assert parse_value("'007'") == "007"
+    assert parse_value("abc") == "abc"
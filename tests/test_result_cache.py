@@ -0,0 +1,88 @@
+import pytest
+
+import result_cache
+from sql_text import is_read_only
+
+
+class Store:
+    """Stand-in for a ResultStore of a given size."""
+
+    def __init__(self, nbytes, spilled=False):
+        self.size = nbytes
+        self.spill = object() if spilled else None
+
+    def nbytes(self):
+        return self.size
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    result_cache.clear()
+    monkeypatch.setattr(result_cache, "CACHE_MAX_BYTES", 100)
+    yield
+    result_cache.clear()
+
+
+def test_get_after_put():
+    stores = [Store(10)]
+    result_cache.put("SELECT 1", "db", stores)
+    assert result_cache.get("SELECT 1", "db")["stores"] is stores
+    assert result_cache.get("SELECT 1", "other") is None
+
+
+def test_key_normalizes_whitespace_comments_and_semicolons():
+    result_cache.put("SELECT  a\n  FROM t -- note\n;", "db", [Store(10)])
+    assert result_cache.get("SELECT a /* x */ FROM t", "db") is not None
+    assert result_cache.get("select a from t", "db") is None  # Case can matter (collation, literals)
+    result_cache.put("SELECT 'a  b'", "db", [Store(10)])
+    assert result_cache.get("SELECT 'a b'", "db") is None  # Literals are kept as written
+
+
+def test_key_includes_parameter_values():
+    result_cache.put("SELECT @id", "db", [Store(10)], {"id": 1})
+    assert result_cache.get("SELECT @id", "db", {"ID": 1}) is not None
+    assert result_cache.get("SELECT @id", "db", {"id": 2}) is None
+    assert result_cache.get("SELECT @id", "db") is None
+
+
+def test_eviction_is_least_recently_used_by_bytes():
+    result_cache.put("SELECT 1", "db", [Store(40)])
+    result_cache.put("SELECT 2", "db", [Store(40)])
+    result_cache.get("SELECT 1", "db")  # 2 is now the oldest
+    result_cache.put("SELECT 3", "db", [Store(40)])
+    assert result_cache.get("SELECT 2", "db") is None
+    assert result_cache.get("SELECT 1", "db") is not None
+    assert result_cache.get("SELECT 3", "db") is not None
+
+
+def test_oversized_and_spilled_results_are_not_cached():
+    result_cache.put("SELECT 1", "db", [Store(60), Store(60)])
+    result_cache.put("SELECT 2", "db", [Store(10, spilled=True)])
+    assert result_cache.get("SELECT 1", "db") is None
+    assert result_cache.get("SELECT 2", "db") is None
+
+
+def test_invalidate_database():
+    result_cache.put("SELECT 1", "db", [Store(10)])
+    result_cache.put("SELECT 1", "other", [Store(10)])
+    result_cache.invalidate_database("db")
+    assert result_cache.get("SELECT 1", "db") is None
+    assert result_cache.get("SELECT 1", "other") is not None
+
+
+@pytest.mark.parametrize("sql, read_only", [
+    ("SELECT * FROM t", True),
+    ("  -- comment\nselect 1", True),
+    ("WITH c AS (SELECT 1 AS a) SELECT a FROM c", True),
+    ("SELECT 'DELETE FROM t'", True),
+    ("SELECT a INTO #copy FROM t", False),
+    ("SELECT 1\nGO\nSELECT 2", True),
+    ("SELECT 1\nGO\nDELETE FROM t", False),
+    ("SELECT 1; UPDATE t SET a = 1", False),
+    ("WITH c AS (SELECT 1 AS a) DELETE FROM t", False),
+    ("EXEC dbo.Report", False),
+    ("DECLARE @a int = 1; SELECT @a", False),
+    ("", False),
+])
+def test_is_read_only(sql, read_only):
+    assert is_read_only(sql) is read_only
@@ -0,0 +1,47 @@
+from result_diff import diff_stores
+from result_store import ResultStore
+
+
+def _store(rows, columns=("id", "v")):
+    store = ResultStore(list(columns))
+    store.append_rows(rows)
+    return store
+
+
+def test_no_key_multiset():
+    old = _store([(1, "a"), (2, "b"), (2, "b")])
+    new = _store([(2, "b"), (3, "c"), (1, "a")])
+    diff = diff_stores(old, new)
+    assert diff["added"] == [(3, "c")]
+    assert diff["removed"] == [(2, "b")]
+    assert diff["unchanged"] == 2
+
+
+def test_hash_collision_is_not_a_match():
+    assert hash(-1) == hash(-2)
+    old = _store([(1, -1), (2, 5)])
+    new = _store([(1, -2), (2, 5)])
+    diff = diff_stores(old, new)
+    assert diff["added"] == [(1, -2)]
+    assert diff["removed"] == [(1, -1)]
+    assert diff["unchanged"] == 1
+
+
+def test_hash_collision_with_key_is_changed():
+    old = _store([(1, -1), (2, 5)])
+    new = _store([(1, -2), (2, 5)])
+    diff = diff_stores(old, new, key="id")
+    assert diff["changed"] == [((1, -1), (1, -2))]
+    assert diff["unchanged"] == 1
+    assert diff["added"] == diff["removed"] == []
+
+
+def test_key_added_removed_and_shared_columns():
+    old = _store([(1, "a", 0), (2, "b", 0)], ("id", "v", "gone"))
+    new = _store([(2, "b"), (3, "c")])
+    diff = diff_stores(old, new, key="id")
+    assert diff["columns"] == ["id", "v"]
+    assert diff["removed_columns"] == ["gone"]
+    assert diff["added"] == [(3, "c")]
+    assert diff["removed"] == [(1, "a")]
+    assert diff["unchanged"] == 1
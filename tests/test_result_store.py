@@ -0,0 +1,97 @@
+import gc
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import result_store
+from result_store import ResultStore, set_memory_budget
+from spill import SPILL_CHUNK_ROWS, SpillFile
+
+
+def _sorted(store, c):
+    keys, nulls = store.sort_keys(c)
+    rows = [i for i in range(len(store)) if not nulls[i]]
+    return [store.value(i, c) for i in sorted(rows, key=keys.__getitem__)]
+
+
+def test_mixed_numbers_sort_by_value():
+    store = ResultStore(["n"], [Decimal])
+    store.append_rows([(10,), (9.5,), (Decimal("9"),), (None,), (100,)])
+    assert _sorted(store, 0) == [Decimal("9"), 9.5, 10, 100]
+
+
+def test_strings_sort_case_insensitively():
+    store = ResultStore(["s"], [str])
+    store.append_rows([("b",), ("A",), ("a",), ("C",)])
+    assert [v.lower() for v in _sorted(store, 0)] == ["a", "a", "b", "c"]
+
+
+def test_other_mixes_sort_by_display_string():
+    store = ResultStore(["x"], [str])
+    store.append_rows([(10,), ("9",), ("abc",)])
+    assert _sorted(store, 0) == [10, "9", "abc"]
+
+
+@pytest.fixture
+def small_budget():
+    saved = result_store.MEMORY_BUDGET
+    set_memory_budget(1)
+    yield
+    set_memory_budget(saved)
+
+
+def _rows(start, count):
+    return [(i, f"name {i}", None if i % 3 else Decimal(i) / 4, datetime(2024, 1, 1) + timedelta(minutes=i))
+            for i in range(start, start + count)]
+
+
+def test_memory_estimate_counts_object_sizes():
+    store = ResultStore(["s", "d"], [str, Decimal])
+    rows = [("x" * 30, Decimal(i) / 7) for i in range(10_000)]
+    store.append_rows(rows)
+    actual = sum(sys.getsizeof(v) + 8 for row in rows for v in row)
+    assert 0.8 * actual < store.nbytes() < 1.5 * actual
+
+
+def test_rows_past_the_budget_spill_and_read_back(small_budget):
+    store = ResultStore(["id", "name", "amount", "at"], [int, str, Decimal, datetime])
+    first, rest = _rows(0, 100), _rows(100, 1000)
+    store.append_rows(first)
+    assert store.spill is None
+    store.append_rows(rest)
+    assert store.spill is not None and store.spill_start == 100
+    assert len(store) == 1100 and store.resident_rows() == 100
+    assert [store.row(i) for i in range(len(store))] == first + rest
+    assert store.column_values(2) == [row[2] for row in first + rest]
+    path = store.spill.path
+    assert os.path.exists(path)
+    store.close()
+    assert not os.path.exists(path)
+
+
+def test_spill_file_is_removed_when_the_store_is_dropped(small_budget):
+    store = ResultStore(["id"], [int])
+    store.append_rows([(1,)])
+    store.append_rows([(2,), (3,)])
+    path = store.spill.path
+    del store
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_spill_file_round_trip():
+    spill = SpillFile()
+    rows = [(i, str(i)) for i in range(SPILL_CHUNK_ROWS * 3 + 10)]
+    for start in range(0, len(rows), 100):
+        spill.append_rows(rows[start:start + 100])
+    assert len(spill) == len(rows)
+    assert spill.row(0) == rows[0] and spill.row(len(rows) - 1) == rows[-1]
+    assert spill.row(SPILL_CHUNK_ROWS + 5) == rows[SPILL_CHUNK_ROWS + 5]
+    assert list(spill.iter_rows()) == rows
+    path = spill.path
+    spill.close()
+    spill.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,27 @@
+import pytest
+
+from sql_text import split_batches
+
+
+@pytest.mark.parametrize("script, batches", [
+    ("SELECT 1\nGO\nSELECT 2", ["SELECT 1", "SELECT 2"]),
+    ("SELECT 1\nGO 3\nSELECT 2", ["SELECT 1", "SELECT 1", "SELECT 1", "SELECT 2"]),
+    ("select 1\n  go  \nselect 2\r\nGo\r\n", ["select 1", "select 2"]),
+    ("SELECT 1\nGO -- end of batch\nSELECT 2", ["SELECT 1", "SELECT 2"]),
+    ("SELECT 1\nGO\nSELECT 2  ", ["SELECT 1", "SELECT 2"]),  # Last batch without a GO
+    ("SELECT 1", ["SELECT 1"]),
+    ("GO\n-- only a comment\nGO\nSELECT 1", ["SELECT 1"]),  # Batches with no code are dropped
+])
+def test_go_separators(script, batches):
+    assert split_batches(script) == batches
+
+
+@pytest.mark.parametrize("script", [
+    "SELECT 'a\nGO\nb'",  # String literal
+    "SELECT 1 /*\nGO\n*/",  # Block comment
+    "SELECT [a\nGO\nb] FROM t",  # Quoted name
+    "SELECT 1\n-- GO\nSELECT 2",  # Line comment
+    "SELECT 1\nGOTO done\nGO x",  # Not a separator line
+])
+def test_go_that_does_not_split(script):
+    assert split_batches(script) == [script]
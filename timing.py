@@ -0,0 +1,58 @@
+# timing.py
+"""
+Per-phase timing of a query run.
+The worker records connect / first row / fetch, the UI adds convert /
+render / autosize, and the totals end up in the status bar and history.
+"""
+
+import time
+from contextlib import contextmanager
+
+# Display order and labels
+PHASES = {
+    "connect": "Connect",
+    "first_row": "Execute to first row",
+    "fetch": "Fetch",
+    "convert": "Value conversion",
+    "render": "Render",
+    "autosize": "Autosize",
+    "write": "Write output",  # cli.py
+}
+
+
+class PhaseTimer:
+    """Accumulates wall time per phase."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, phase, seconds):
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def merge(self, totals):
+        for phase, seconds in totals.items():
+            self.add(phase, seconds)
+
+    def as_dict(self):
+        """Phase -> seconds (rounded), in display order; for history.json."""
+        ordered = [p for p in PHASES if p in self.totals] + [p for p in self.totals if p not in PHASES]
+        return {phase: round(self.totals[phase], 4) for phase in ordered}
+
+
+def format_timings(timings, total=None):
+    """Multi-line breakdown for the status bar tooltip."""
+    lines = [f"{PHASES.get(phase, phase):<22}{seconds:>9.3f}s" for phase, seconds in timings.items()]
+    if total is not None:
+        other = total - sum(timings.values())
+        if other > 0.0005:
+            lines.append(f"{'Other (queue, UI idle)':<22}{other:>9.3f}s")
+        lines.append(f"{'Total':<22}{total:>9.3f}s")
+    return "\n".join(lines)